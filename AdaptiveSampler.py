@@ -0,0 +1,156 @@
+import numpy as np
+import Wavefront
+
+
+QUADRANTS = ((0, 0), (1, 1), (1, 0), (0, 1))
+SAMPLES_PER_PASS = 4
+
+
+def sample_offsets(count):
+    levels = 1
+    while 4 ** levels < count:
+        levels += 1
+        
+    grid = 2 ** levels
+    offsets = []
+    
+    for k in range(min(count, 4 ** levels)):
+        x = y = 0
+        size = grid
+        
+        for level in range(levels):
+            size //= 2
+            dx, dy = QUADRANTS[(k >> (2 * level)) & 3]
+            x += dx * size
+            y += dy * size
+            
+        offsets.append(((x + 0.5) / grid, (y + 0.5) / grid))
+        
+    return np.array(offsets, dtype=float).reshape(-1, 2)
+
+
+def camera_dirs(renderer, px, py):
+    dtype = renderer.dtype if renderer.mode in Wavefront.BATCH_MODES else float
+    dirs = np.empty((len(px), 3), dtype=dtype)
+    dirs[:, 0] = (2 * (px / renderer.width) - 1) * renderer.tan_fov * renderer.aspect
+    dirs[:, 1] = (1 - 2 * (py / renderer.height)) * renderer.tan_fov
+    dirs[:, 2] = -1.0
+    dirs /= np.linalg.norm(dirs, axis=1, keepdims=True) + 1e-8
+    
+    return dirs
+
+
+def _trace_scalar(renderer, dirs):
+    index = {id(obj): k for k, obj in enumerate(renderer.objects)}
+    colors = np.empty((len(dirs), 3), dtype=float)
+    ids = np.full(len(dirs), -1, dtype=int)
+    
+    for n, d in enumerate(dirs):
+        hit = renderer.scene_intersect(renderer.cam_pos, d)
+        
+        if hit is None:
+            colors[n] = renderer.get_env_map_color(renderer.cam_pos, d) if renderer.env is not None else renderer.bg_color
+            continue
+            
+        colors[n] = hit.obj.material.get_surface_color(hit, renderer, 0)
+        ids[n] = index[id(hit.obj)]
+        
+    return colors, ids
+
+
+def _primary_tracer(renderer, tracer=None):
+    if renderer.mode in Wavefront.BATCH_MODES:
+        tracer = tracer if tracer is not None else Wavefront.WavefrontTracer(renderer)
+        
+    cam = np.array(renderer.cam_pos, dtype=renderer.dtype)
+    
+    def trace(dirs):
+        if renderer.stats is not None:
+            renderer.stats.ray("primary", 0, len(dirs))
+            
+        if renderer.mode not in Wavefront.BATCH_MODES:
+            return _trace_scalar(renderer, dirs)
+            
+        return tracer.trace_with_ids(np.broadcast_to(cam, dirs.shape), dirs)
+        
+    return trace
+
+
+def find_edges(colors, ids, threshold):
+    colors = np.clip(colors, 0.0, 1.0)
+    edges = np.zeros(ids.shape, dtype=bool)
+    
+    rows = (np.abs(np.diff(colors, axis=0)).max(axis=2) > threshold) | (np.diff(ids, axis=0) != 0)
+    edges[1:] |= rows
+    edges[:-1] |= rows
+    
+    cols = (np.abs(np.diff(colors, axis=1)).max(axis=2) > threshold) | (np.diff(ids, axis=1) != 0)
+    edges[:, 1:] |= cols
+    edges[:, :-1] |= cols
+    
+    return edges
+
+
+def render_tile(renderer, x0, y0, x1, y1, tracer=None):
+    trace = _primary_tracer(renderer, tracer)
+    threshold = renderer.aa_threshold
+    
+    ax0, ay0 = max(x0 - 1, 0), max(y0 - 1, 0)
+    ax1, ay1 = min(x1 + 1, renderer.width), min(y1 + 1, renderer.height)
+    jj, ii = np.mgrid[ay0:ay1, ax0:ax1]
+    
+    colors, ids = trace(camera_dirs(renderer, ii.ravel() + 0.5, jj.ravel() + 0.5))
+    colors = colors.reshape(ay1 - ay0, ax1 - ax0, 3)
+    ids = ids.reshape(ay1 - ay0, ax1 - ax0)
+    
+    inner = (slice(y0 - ay0, y1 - ay0), slice(x0 - ax0, x1 - ax0))
+    pending = np.argwhere(find_edges(colors, ids, threshold)[inner])
+    colors = colors[inner]
+    ids = ids[inner]
+    
+    total = colors.copy()
+    count = np.ones(ids.shape, dtype=float)
+    lo = np.clip(colors, 0.0, 1.0)
+    hi = lo.copy()
+    offsets = sample_offsets(renderer.aa_samples - 1)
+    
+    for start in range(0, len(offsets), SAMPLES_PER_PASS):
+        if not len(pending):
+            break
+            
+        batch = offsets[start:start + SAMPLES_PER_PASS]
+        r, q = pending[:, 0], pending[:, 1]
+        px = (x0 + q)[:, None] + batch[None, :, 0]
+        py = (y0 + r)[:, None] + batch[None, :, 1]
+        
+        c, k = trace(camera_dirs(renderer, px.ravel(), py.ravel()))
+        c = c.reshape(len(pending), len(batch), 3)
+        k = k.reshape(len(pending), len(batch))
+        
+        total[r, q] += c.sum(axis=1)
+        count[r, q] += len(batch)
+        
+        c = np.clip(c, 0.0, 1.0)
+        lo[r, q] = np.minimum(lo[r, q], c.min(axis=1))
+        hi[r, q] = np.maximum(hi[r, q], c.max(axis=1))
+        
+        mixed = (k != ids[r, q][:, None]).any(axis=1)
+        pending = pending[mixed | ((hi[r, q] - lo[r, q]).max(axis=1) > threshold)]
+        
+    return total / count[..., None]
+
+
+def render(renderer, row_callback=None):
+    tracer = Wavefront.WavefrontTracer(renderer) if renderer.mode in Wavefront.BATCH_MODES else None
+    tile = renderer.tile_size
+    
+    for y0 in range(0, renderer.height, tile):
+        y1 = min(y0 + tile, renderer.height)
+        
+        for x0 in range(0, renderer.width, tile):
+            x1 = min(x0 + tile, renderer.width)
+            renderer.store_tile(x0, y0, renderer.render_tile(x0, y0, x1, y1, tracer))
+            
+        if row_callback:
+            for j in range(y0, y1):
+                row_callback(j)
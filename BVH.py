@@ -0,0 +1,267 @@
+import numpy as np
+
+
+BVH_PAD = 1e-4
+SAH_BINS = 12
+NODE_ARRAYS = ("order", "node_min", "node_max", "node_left", "node_right", "node_axis", "node_start", "node_size")
+
+
+def _area(lo, hi):
+    ext = np.maximum(hi - lo, 0.0)
+    return 2.0 * (ext[..., 0] * ext[..., 1] + ext[..., 1] * ext[..., 2] + ext[..., 2] * ext[..., 0])
+
+
+class BVH(object):
+    def __init__(self, bounds_min, bounds_max, prim_ids=None, leaf_size=4, bins=SAH_BINS):
+        bounds_min = np.asarray(bounds_min, dtype=float).reshape(-1, 3) - BVH_PAD
+        bounds_max = np.asarray(bounds_max, dtype=float).reshape(-1, 3) + BVH_PAD
+        
+        self.count = len(bounds_min)
+        self.leaf_size = max(1, int(leaf_size))
+        self.bins = max(2, int(bins))
+        
+        self._build(bounds_min, bounds_max)
+        
+        if prim_ids is not None:
+            self.order = np.asarray(prim_ids, dtype=int)[self.order]
+            self._leaf = [
+                self.order[s:s + n].tolist() if l < 0 else None
+                for l, s, n in zip(self.node_left, self.node_start, self.node_size)
+            ]
+
+    @classmethod
+    def from_arrays(cls, arrays, leaf_size=4, bins=SAH_BINS):
+        bvh = cls.__new__(cls)
+        
+        for name in NODE_ARRAYS:
+            setattr(bvh, name, arrays[name])
+            
+        bvh.count = len(bvh.order)
+        bvh.leaf_size = max(1, int(leaf_size))
+        bvh.bins = max(2, int(bins))
+        bvh._index()
+        
+        return bvh
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in NODE_ARRAYS}
+
+    def _build(self, bmin, bmax):
+        centroids = (bmin + bmax) * 0.5
+        order = np.arange(self.count)
+        
+        node_min = []
+        node_max = []
+        left = []
+        right = []
+        axis = []
+        start = []
+        size = []
+        
+        def new_node():
+            node_min.append(None)
+            node_max.append(None)
+            left.append(-1)
+            right.append(-1)
+            axis.append(0)
+            start.append(0)
+            size.append(0)
+            return len(node_min) - 1
+            
+        stack = [(new_node(), 0, self.count)] if self.count else []
+        
+        while stack:
+            node, lo, hi = stack.pop()
+            idx = order[lo:hi]
+            box_min = bmin[idx].min(axis=0)
+            box_max = bmax[idx].max(axis=0)
+            node_min[node] = box_min
+            node_max[node] = box_max
+            
+            split = self._find_split(bmin[idx], bmax[idx], centroids[idx], box_min, box_max)
+            
+            if split is None:
+                start[node] = lo
+                size[node] = hi - lo
+                continue
+                
+            split_axis, go_left = split
+            order[lo:hi] = np.concatenate((idx[go_left], idx[~go_left]))
+            mid = lo + int(go_left.sum())
+            
+            axis[node] = split_axis
+            left[node] = new_node()
+            right[node] = new_node()
+            stack.append((right[node], mid, hi))
+            stack.append((left[node], lo, mid))
+            
+        self.order = order
+        self.node_min = np.array(node_min, dtype=float).reshape(-1, 3)
+        self.node_max = np.array(node_max, dtype=float).reshape(-1, 3)
+        self.node_left = np.array(left, dtype=int)
+        self.node_right = np.array(right, dtype=int)
+        self.node_axis = np.array(axis, dtype=int)
+        self.node_start = np.array(start, dtype=int)
+        self.node_size = np.array(size, dtype=int)
+        
+        self._index()
+
+    def _index(self):
+        left = self.node_left.tolist()
+        start = self.node_start.tolist()
+        size = self.node_size.tolist()
+        
+        self._lo = [tuple(v) for v in self.node_min.tolist()]
+        self._hi = [tuple(v) for v in self.node_max.tolist()]
+        self._children = list(zip(left, self.node_right.tolist(), self.node_axis.tolist()))
+        self._leaf = [
+            self.order[s:s + n].tolist() if l < 0 else None
+            for l, s, n in zip(left, start, size)
+        ]
+
+    def _find_split(self, bmin, bmax, centroids, box_min, box_max):
+        n = len(centroids)
+        
+        if n <= self.leaf_size:
+            return None
+            
+        c_min = centroids.min(axis=0)
+        c_max = centroids.max(axis=0)
+        extent = c_max - c_min
+        
+        best_cost = np.inf
+        best = None
+        
+        for ax in range(3):
+            if extent[ax] <= 0.0:
+                continue
+                
+            bin_id = ((centroids[:, ax] - c_min[ax]) / extent[ax] * self.bins).astype(int)
+            bin_id = np.minimum(bin_id, self.bins - 1)
+            
+            counts = np.bincount(bin_id, minlength=self.bins)
+            used = np.nonzero(counts)[0]
+            
+            sort = np.argsort(bin_id, kind="stable")
+            starts = np.concatenate(([0], np.cumsum(counts[used])[:-1]))
+            lo = np.full((self.bins, 3), np.inf)
+            hi = np.full((self.bins, 3), -np.inf)
+            lo[used] = np.minimum.reduceat(bmin[sort], starts, axis=0)
+            hi[used] = np.maximum.reduceat(bmax[sort], starts, axis=0)
+            
+            left_lo = np.minimum.accumulate(lo, axis=0)[:-1]
+            left_hi = np.maximum.accumulate(hi, axis=0)[:-1]
+            right_lo = np.minimum.accumulate(lo[::-1], axis=0)[::-1][1:]
+            right_hi = np.maximum.accumulate(hi[::-1], axis=0)[::-1][1:]
+            
+            left_n = np.cumsum(counts)[:-1]
+            right_n = n - left_n
+            
+            cost = _area(left_lo, left_hi) * left_n + _area(right_lo, right_hi) * right_n
+            cost = np.where((left_n == 0) | (right_n == 0), np.inf, cost)
+            k = int(np.argmin(cost))
+            
+            if cost[k] < best_cost:
+                best_cost = cost[k]
+                best = (ax, bin_id <= k)
+                
+        if best is None:
+            ax = int(np.argmax(box_max - box_min))
+            go_left = np.zeros(n, dtype=bool)
+            go_left[np.argsort(centroids[:, ax], kind="stable")[:n // 2]] = True
+            return ax, go_left
+            
+        return best
+
+    def traverse(self, orig, direction, visit, t_max=np.inf):
+        if not self.count:
+            return t_max
+            
+        ox, oy, oz = float(orig[0]), float(orig[1]), float(orig[2])
+        dx, dy, dz = float(direction[0]), float(direction[1]), float(direction[2])
+        ix = 1.0 / dx if dx != 0.0 else 1e300
+        iy = 1.0 / dy if dy != 0.0 else 1e300
+        iz = 1.0 / dz if dz != 0.0 else 1e300
+        neg = (dx < 0.0, dy < 0.0, dz < 0.0)
+        
+        lo_list = self._lo
+        hi_list = self._hi
+        children = self._children
+        leaves = self._leaf
+        stack = [0]
+        
+        while stack:
+            node = stack.pop()
+            lo = lo_list[node]
+            hi = hi_list[node]
+            
+            t0 = (lo[0] - ox) * ix
+            t1 = (hi[0] - ox) * ix
+            if t0 > t1:
+                t0, t1 = t1, t0
+                
+            t2 = (lo[1] - oy) * iy
+            t3 = (hi[1] - oy) * iy
+            if t2 > t3:
+                t2, t3 = t3, t2
+                
+            t4 = (lo[2] - oz) * iz
+            t5 = (hi[2] - oz) * iz
+            if t4 > t5:
+                t4, t5 = t5, t4
+                
+            t_enter = max(t0, t2, t4)
+            t_exit = min(t1, t3, t5)
+            
+            if t_enter > t_exit or t_exit < 0.0 or t_enter > t_max:
+                continue
+                
+            prims = leaves[node]
+            
+            if prims is not None:
+                t_max = visit(prims, t_max)
+                if t_max is None:
+                    return None
+                continue
+                
+            near, far, ax = children[node]
+            if neg[ax]:
+                near, far = far, near
+            stack.append(far)
+            stack.append(near)
+            
+        return t_max
+
+    def traverse_batch(self, orig, dirs, t_best, visit):
+        if not self.count or not len(dirs):
+            return
+            
+        safe = np.where(dirs == 0.0, 1e-300, np.asarray(dirs, dtype=float))
+        inv = 1.0 / safe
+        stack = [(0, np.arange(len(dirs)))]
+        
+        while stack:
+            node, rays = stack.pop()
+            
+            t0 = (self.node_min[node] - orig[rays]) * inv[rays]
+            t1 = (self.node_max[node] - orig[rays]) * inv[rays]
+            t_enter = np.minimum(t0, t1).max(axis=1)
+            t_exit = np.maximum(t0, t1).min(axis=1)
+            
+            rays = rays[(t_enter <= t_exit) & (t_exit >= 0.0) & (t_enter <= t_best[rays])]
+            
+            if not rays.size:
+                continue
+                
+            left = self.node_left[node]
+            
+            if left < 0:
+                s = self.node_start[node]
+                visit(self.order[s:s + self.node_size[node]], rays)
+                continue
+                
+            near, far = left, self.node_right[node]
+            if dirs[rays, self.node_axis[node]].sum() < 0.0:
+                near, far = far, near
+            stack.append((far, rays))
+            stack.append((near, rays))
\ No newline at end of file
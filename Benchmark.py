@@ -0,0 +1,344 @@
+import sys
+import os
+import json
+import time
+import platform
+import subprocess
+import tempfile
+import numpy as np
+import OBJ_Loader
+import TextureCache
+import RayTracer
+from GraphicLibrary import Renderer
+from Figures import Sphere, Plane, Disk, Triangle, AABB, Cylinder, TriangleMesh
+from Lights import AmbientLight, DirectionalLight, PointLight
+from Materials import Material, OPAQUE, REFLECTIVE
+from RayTracer import get_option
+
+
+MIN_TIME = 0.2
+REPEAT = 3
+SCENE_RESOLUTIONS = ((32, 18), (64, 36), (128, 72))
+SCALING_SIZES = {
+    "spheres": (16, 64, 256, 1024),
+    "triangles": (64, 256, 1024, 4096),
+    "lights": (1, 2, 4, 8),
+}
+SCALING_RESOLUTION = (32, 18)
+CAMERA = (0.0, 1.4, 3.2)
+
+
+def _run(fn, calls):
+    start = time.perf_counter()
+    
+    for _ in range(calls):
+        fn()
+        
+    return time.perf_counter() - start
+
+
+def measure(fn, min_time=MIN_TIME, repeat=REPEAT):
+    calls = 1
+    elapsed = _run(fn, calls)
+    
+    while elapsed < min_time:
+        calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9)))
+        elapsed = _run(fn, calls)
+        
+    best = min([elapsed] + [_run(fn, calls) for _ in range(repeat - 1)])
+    
+    return best / calls
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    
+    return result, time.perf_counter() - start
+
+
+def scaling_exponent(sizes, seconds):
+    if len(sizes) < 2:
+        return None
+        
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+
+def _normalize(v):
+    v = np.array(v, dtype=float)
+    return v / np.linalg.norm(v)
+
+
+def sphere_mesh(material, center=(0.0, 0.0, 0.0), radius=1.0, rings=24, segments=48):
+    theta = np.linspace(0.0, np.pi, rings + 1)
+    phi = np.linspace(0.0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    
+    verts = np.stack((np.sin(t) * np.cos(p), np.cos(t), np.sin(t) * np.sin(p)), axis=-1).reshape(-1, 3)
+    verts = verts * radius + np.array(center, dtype=float)
+    
+    r, s = np.meshgrid(np.arange(rings), np.arange(segments), indexing="ij")
+    a = r * segments + s
+    b = r * segments + (s + 1) % segments
+    c = a + segments
+    d = b + segments
+    faces = np.concatenate((np.stack((a, c, b), axis=-1), np.stack((b, c, d), axis=-1))).reshape(-1, 3)
+    
+    return TriangleMesh(verts, faces, material)
+
+
+def bench_primitives():
+    mat = Material()
+    origin = np.array((0.0, 0.0, 5.0))
+    miss_dir = _normalize((0.0, 1.0, 1.0))
+    
+    cases = {
+        "Sphere": (Sphere((0.0, 0.0, 0.0), 1.0, mat), (0.0, 0.0, 0.0)),
+        "Plane": (Plane((0.0, -1.0, 0.0), (0.0, 1.0, 0.0), mat), (0.0, -1.0, 0.0)),
+        "Disk": (Disk((0.0, 0.0, 0.0), (0.0, 0.0, 1.0), 1.0, mat), (0.0, 0.0, 0.0)),
+        "Triangle": (Triangle((-1.0, -1.0, 0.0), (1.0, -1.0, 0.0), (0.0, 1.0, 0.0), mat), (0.0, -0.2, 0.0)),
+        "AABB": (AABB((0.0, 0.0, 0.0), (1.0, 1.0, 1.0), mat), (0.0, 0.0, 0.0)),
+        "Cylinder": (Cylinder((0.0, -0.5, 0.0), (0.0, 1.0, 0.0), 0.5, 1.0, mat), (0.0, 0.0, 0.0)),
+        "TriangleMesh": (sphere_mesh(mat), (0.0, 0.0, 0.0)),
+    }
+    
+    results = {}
+    
+    for name, (obj, target) in cases.items():
+        hit_dir = _normalize(np.array(target) - origin)
+        
+        if obj.ray_intersect(origin, hit_dir) is None or obj.ray_intersect(origin, miss_dir) is not None:
+            raise RuntimeError(f"Benchmark rays for {name} do not hit/miss as expected")
+            
+        hit = measure(lambda: obj.ray_intersect(origin, hit_dir))
+        miss = measure(lambda: obj.ray_intersect(origin, miss_dir))
+        
+        results[name] = {
+            "hit_ns": hit * 1e9,
+            "miss_ns": miss * 1e9,
+            "hit_rays_per_sec": 1.0 / hit,
+            "miss_rays_per_sec": 1.0 / miss,
+        }
+        
+    return results
+
+
+def _scene_renderer(width, height, **kwargs):
+    rend = Renderer(width, height, fov=55, **kwargs)
+    rend.cam_pos = np.array(CAMERA, dtype=float)
+    
+    return rend
+
+
+def bench_materials():
+    rend = _scene_renderer(64, 36)
+    RayTracer.build_scene(rend)
+    rend.ensure_acceleration()
+    
+    hits = {}
+    
+    for j in range(rend.height):
+        y = (1 - 2 * ((j + 0.5) / rend.height)) * rend.tan_fov
+        
+        for i in range(rend.width):
+            x = (2 * ((i + 0.5) / rend.width) - 1) * rend.tan_fov * rend.aspect
+            hit = rend.scene_intersect(rend.cam_pos, _normalize((x, y, -1.0)))
+            
+            if hit is not None:
+                mat = hit.obj.material
+                textured = "textured" if getattr(mat, "texture", None) is not None else "plain"
+                hits.setdefault(f"{mat.mat_type}/{textured}/{type(hit.obj).__name__}", hit)
+                
+    results = {}
+    
+    for name, hit in sorted(hits.items()):
+        seconds = measure(lambda: hit.obj.material.get_surface_color(hit, rend, 0))
+        results[name] = {"shade_us": seconds * 1e6, "shades_per_sec": 1.0 / seconds}
+        
+    return results
+
+
+def bench_env_map(batch=100000):
+    rend = Renderer(1, 1)
+    rend.load_env_map("sky.jpg")
+    
+    if rend.env is None:
+        return {}
+        
+    dirs = np.random.default_rng(0).normal(size=(batch, 3))
+    scalar = measure(lambda: rend.get_env_map_color(None, dirs[0]))
+    batched = measure(lambda: rend.sample_env(dirs))
+    
+    return {
+        "scalar_us": scalar * 1e6,
+        "scalar_lookups_per_sec": 1.0 / scalar,
+        "batch_size": batch,
+        "batch_lookups_per_sec": batch / batched,
+    }
+
+
+def bench_obj_loading():
+    base = Material()
+    models = {"star.obj": (0.4, (0.0, -0.1, -2.0)), "mario.obj": (11, (0.0, -0.6, -14.0))}
+    results = {}
+    
+    for path, (scale, translate) in models.items():
+        if not os.path.exists(path):
+            continue
+            
+        parse = measure(lambda: OBJ_Loader._load_obj_arrays(path, scale, translate, use_cache=False), repeat=1)
+        OBJ_Loader._load_obj_arrays(path, scale, translate)
+        cached = measure(lambda: OBJ_Loader._load_obj_arrays(path, scale, translate))
+        meshes, build = timed(lambda: OBJ_Loader.load_obj_as_meshes(path, base, scale=scale, translate=translate))
+        warm = measure(lambda: OBJ_Loader.load_obj_as_meshes(path, base, scale=scale, translate=translate))
+        
+        results[path] = {
+            "faces": sum(len(m) for m in meshes),
+            "parse_ms": parse * 1e3,
+            "cached_ms": cached * 1e3,
+            "meshes_ms": build * 1e3,
+            "meshes_cached_ms": warm * 1e3,
+        }
+        
+    return results
+
+
+def render_stages(rend, build):
+    stages = {}
+    _, stages["scene"] = timed(lambda: build(rend))
+    _, stages["acceleration"] = timed(rend.build_acceleration)
+    _, stages["render"] = timed(rend.render)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        _, stages["save"] = timed(lambda: rend.save_bmp(os.path.join(tmp, "bench.bmp")))
+        
+    primary = rend.width * rend.height * rend.ssaa * rend.ssaa
+    
+    return {
+        "objects": len(rend.objects),
+        "lights": len(rend.lights),
+        "primary_rays": primary,
+        "rays_per_sec": primary / stages["render"],
+        "stages": stages,
+    }
+
+
+def bench_scenes(modes, resolutions):
+    results = []
+    
+    for mode in modes:
+        for width, height in resolutions:
+            TextureCache.clear()
+            rend = _scene_renderer(width, height, mode=mode)
+            entry = {"mode": mode, "width": width, "height": height}
+            entry.update(render_stages(rend, RayTracer.build_scene))
+            results.append(entry)
+            
+    return results
+
+
+def procedural_scene(kind, n, seed=0):
+    rng = np.random.default_rng(seed)
+    
+    def build(rend):
+        mats = [
+            Material(diffuse=tuple(rng.uniform(0.2, 1.0, 3)), ks=0.3, shininess=32, mat_type=OPAQUE),
+            Material(diffuse=(0.9, 0.9, 0.9), ks=1.0, shininess=128, mat_type=REFLECTIVE, reflectivity=0.5),
+        ]
+        rend.add_object(Plane((0.0, -0.9, 0.0), (0.0, 1.0, 0.0), mats[0]))
+        
+        count = n if kind != "lights" else 64
+        centers = np.column_stack((rng.uniform(-6, 6, count), rng.uniform(-0.8, 3.0, count), rng.uniform(-14, -2, count)))
+        
+        for k, c in enumerate(centers):
+            mat = mats[k % 2]
+            
+            if kind == "triangles":
+                a, b = rng.normal(scale=0.3, size=(2, 3))
+                rend.add_object(Triangle(c, c + a, c + b, mat))
+            else:
+                rend.add_object(Sphere(c, rng.uniform(0.1, 0.4), mat))
+                
+        rend.add_light(AmbientLight(intensity=0.2))
+        rend.add_light(DirectionalLight(intensity=0.8, direction=(-0.35, -1.0, -0.4)))
+        
+        for _ in range(n if kind == "lights" else 1):
+            rend.add_light(PointLight(intensity=0.5, position=tuple(rng.uniform((-5, 1, -10), (5, 4, 2))), range_dist=25.0))
+            
+    return build
+
+
+def bench_scaling(modes, sizes=SCALING_SIZES, resolution=SCALING_RESOLUTION):
+    results = {}
+    
+    for mode in modes:
+        for kind, counts in sizes.items():
+            runs = []
+            
+            for n in counts:
+                rend = _scene_renderer(*resolution, mode=mode)
+                entry = {"n": n}
+                entry.update(render_stages(rend, procedural_scene(kind, n)))
+                runs.append(entry)
+                
+            results[f"{mode}/{kind}"] = {
+                "runs": runs,
+                "render_exponent": scaling_exponent(counts, [r["stages"]["render"] for r in runs]),
+                "acceleration_exponent": scaling_exponent(counts, [max(r["stages"]["acceleration"], 1e-9) for r in runs]),
+            }
+            
+    return results
+
+
+def environment_info():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = None
+        
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main():
+    quick = "--quick" in sys.argv
+    modes = get_option("--modes", "scalar,wavefront,deferred").split(",")
+    suites = get_option("--only", "primitives,materials,env,obj,scenes,scaling").split(",")
+    output_path = get_option("--output")
+    
+    resolutions = SCENE_RESOLUTIONS[:1] if quick else SCENE_RESOLUTIONS
+    sizes = {kind: counts[:2] for kind, counts in SCALING_SIZES.items()} if quick else SCALING_SIZES
+    
+    runners = {
+        "primitives": bench_primitives,
+        "materials": bench_materials,
+        "env": bench_env_map,
+        "obj": bench_obj_loading,
+        "scenes": lambda: bench_scenes(modes, resolutions),
+        "scaling": lambda: bench_scaling(modes, sizes),
+    }
+    
+    report = {"environment": environment_info(), "results": {}}
+    
+    for name in suites:
+        sys.stderr.write(f"[benchmark] {name}...\n")
+        report["results"][name], seconds = timed(runners[name])
+        sys.stderr.write(f"[benchmark] {name}: {seconds:0.2f} s\n")
+        
+    text = json.dumps(report, indent=2)
+    
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
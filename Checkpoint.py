@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import Wavefront
+import ParallelRenderer
+import Distributed
+
+
+MAGIC = b"RTCKPT01"
+ALIGN = 64
+SUFFIX = ".ckpt"
+FLUSH_INTERVAL = 5.0
+SCENE_SETTINGS = (
+    "width", "height", "fov", "ssaa", "mode", "tile_size", "cam_pos", "bg_color", "max_depth",
+    "env", "env_yaw", "env_vflip", "aa", "aa_samples", "aa_threshold",
+    "min_weight", "roulette", "roulette_threshold", "roulette_seed", "precision",
+)
+SKIP_ATTRS = ("bvh", "_texture", "_texture_loaded")
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def checkpoint_path(output_path):
+    return output_path + SUFFIX
+
+
+def _feed(h, value, seen):
+    if isinstance(value, np.ndarray):
+        h.update(f"{value.dtype.str}{value.shape}".encode("utf-8"))
+        h.update(np.ascontiguousarray(value).view(np.uint8))
+        
+    elif value is None or isinstance(value, (bool, int, float, str, bytes, np.generic)):
+        h.update(repr(value).encode("utf-8"))
+        
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            _feed(h, key, seen)
+            _feed(h, value[key], seen)
+            
+    elif isinstance(value, (list, tuple)):
+        h.update(f"{type(value).__name__}{len(value)}".encode("utf-8"))
+        for item in value:
+            _feed(h, item, seen)
+            
+    elif hasattr(value, "__dict__"):
+        h.update(type(value).__name__.encode("utf-8"))
+        
+        if id(value) in seen:
+            return
+            
+        seen.add(id(value))
+        _feed(h, {k: v for k, v in vars(value).items() if k not in SKIP_ATTRS}, seen)
+        
+    else:
+        h.update(type(value).__name__.encode("utf-8"))
+
+
+def scene_hash(renderer):
+    h = hashlib.sha1()
+    seen = set()
+    
+    for name in SCENE_SETTINGS:
+        _feed(h, getattr(renderer, name, None), seen)
+        
+    _feed(h, renderer.objects, seen)
+    _feed(h, renderer.lights, seen)
+    
+    return h.hexdigest()
+
+
+def _read_header(path):
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            size = int.from_bytes(f.read(8), "little")
+            return json.loads(f.read(size).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+class Checkpoint(object):
+    def __init__(self, path, renderer, resume=False):
+        self.path = path
+        self.width = renderer.width
+        self.height = renderer.height
+        self.tiles = ParallelRenderer.tile_grid(self.width, self.height, renderer.tile_size)
+        self.header = {
+            "hash": scene_hash(renderer),
+            "width": self.width,
+            "height": self.height,
+            "tile_size": renderer.tile_size,
+            "tiles": len(self.tiles),
+        }
+        self.pending = []
+        self.last_flush = time.perf_counter()
+        
+        existing = _read_header(path) if resume else None
+        self.stale = existing is not None and existing != self.header
+        
+        if existing is None or self.stale:
+            self._create()
+            
+        self._map()
+        self.restored = int(np.count_nonzero(self.mask))
+
+    def _layout(self):
+        header = json.dumps(self.header, sort_keys=True).encode("utf-8")
+        mask_start = _aligned(len(MAGIC) + 8 + len(header))
+        pixel_start = _aligned(mask_start + len(self.tiles))
+        
+        return header, mask_start, pixel_start
+
+    def _create(self):
+        header, _, pixel_start = self._layout()
+        
+        with open(self.path, "w+b") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            f.truncate(pixel_start + self.width * self.height * 3 * 4)
+
+    def _map(self):
+        _, mask_start, pixel_start = self._layout()
+        self.mask = np.memmap(self.path, dtype=np.uint8, mode="r+", offset=mask_start, shape=(len(self.tiles),))
+        self.pixels = np.memmap(self.path, dtype=np.float32, mode="r+", offset=pixel_start, shape=(self.height, self.width, 3))
+
+    def missing(self):
+        return [k for k in range(len(self.tiles)) if not self.mask[k]]
+
+    def restore(self, renderer):
+        done = [k for k in range(len(self.tiles)) if self.mask[k]]
+        
+        for k in done:
+            x0, y0, x1, y1 = self.tiles[k]
+            renderer.store_tile(x0, y0, np.array(self.pixels[y0:y1, x0:x1]))
+            
+        return done
+
+    def store(self, k, colors):
+        x0, y0, x1, y1 = self.tiles[k]
+        self.pixels[y0:y1, x0:x1] = colors
+        self.pending.append(k)
+        
+        if time.perf_counter() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.pixels.flush()
+            self.mask[self.pending] = 1
+            self.mask.flush()
+            self.pending = []
+            
+        self.last_flush = time.perf_counter()
+
+    def close(self, remove=False):
+        if self.pixels is None:
+            return
+            
+        self.flush()
+        self.mask = None
+        self.pixels = None
+        
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def render(renderer, checkpoint, row_callback=None):
+    todo = checkpoint.missing()
+    checkpoint.restore(renderer)
+    
+    row_left = ParallelRenderer.row_counts([checkpoint.tiles[k] for k in todo], renderer.height)
+    
+    if row_callback:
+        for j in range(renderer.height):
+            if row_left[j] == 0:
+                row_callback(j)
+                
+    if renderer.distributed is not None:
+        Distributed.render(renderer, row_callback, checkpoint)
+        return
+        
+    if renderer.workers > 1:
+        ParallelRenderer.render(renderer, row_callback, checkpoint)
+        return
+        
+    tracer = Wavefront.WavefrontTracer(renderer) if renderer.mode in Wavefront.BATCH_MODES else None
+    
+    for k in todo:
+        x0, y0, x1, y1 = checkpoint.tiles[k]
+        colors = renderer.render_tile(x0, y0, x1, y1, tracer)
+        renderer.store_tile(x0, y0, colors)
+        checkpoint.store(k, colors)
+        
+        for j in range(y0, y1):
+            row_left[j] -= x1 - x0
+            if row_left[j] == 0 and row_callback:
+                row_callback(j)
@@ -0,0 +1,308 @@
+import os
+import copy
+import time
+import queue
+import pickle
+import socket
+import secrets
+import threading
+import collections
+import multiprocessing as mp
+from multiprocessing.connection import Listener, Client
+import numpy as np
+import Wavefront
+import ParallelRenderer
+
+
+DEFAULT_PORT = 47600
+AUTHKEY_ENV = "RAYTRACER_AUTHKEY"
+AUTHKEY_BYTES = 32
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+TILE_TIMEOUT = 120.0
+WAIT_INTERVAL = 0.2
+CONNECT_RETRIES = 30
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    host, _, port = text.rpartition(":")
+    
+    return (host or default_host, int(port) if port else DEFAULT_PORT)
+
+
+def authkey_from_env():
+    key = os.environ.get(AUTHKEY_ENV)
+    
+    return key.encode("utf-8") if key else None
+
+
+def generate_authkey():
+    return secrets.token_hex(AUTHKEY_BYTES).encode("ascii")
+
+
+def is_loopback(address):
+    return address[0] in LOOPBACK_HOSTS or address[0].startswith("127.")
+
+
+def resolve_authkey(address, authkey=None):
+    authkey = authkey if authkey is not None else authkey_from_env()
+    
+    if authkey is not None:
+        return authkey
+        
+    if not is_loopback(address):
+        raise ValueError(f"Coordinator on {address[0]} requires an authkey (--authkey or {AUTHKEY_ENV})")
+        
+    return generate_authkey()
+
+
+def scene_payload(renderer):
+    renderer.ensure_acceleration()
+    renderer.compile_lights()
+    
+    for obj in renderer.objects:
+        material = getattr(obj, "material", None)
+        if material is not None:
+            material.texture
+            
+    scene = copy.copy(renderer)
+    scene.framebuffer = None
+    scene.framebuffer_path = None
+    scene.outputs = []
+    scene.checkpoint_path = None
+    scene.workers = 1
+    scene.stats = None
+    
+    return pickle.dumps(scene, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class TileScheduler(object):
+    def __init__(self, tiles, timeout=TILE_TIMEOUT):
+        self.tiles = tiles
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.pending = collections.deque(range(len(tiles)))
+        self.in_flight = {}
+        self.done = set()
+
+    def finished(self):
+        with self.lock:
+            return len(self.done) == len(self.tiles)
+
+    def next(self, worker):
+        now = time.perf_counter()
+        
+        with self.lock:
+            if self.pending:
+                k = self.pending.popleft()
+                self.in_flight[k] = (worker, now)
+                return k
+                
+            stale = [(t, k) for k, (w, t) in self.in_flight.items() if w != worker and now - t >= self.timeout]
+            
+            if stale:
+                k = min(stale)[1]
+                self.in_flight[k] = (worker, now)
+                return k
+                
+            return None
+
+    def complete(self, k):
+        with self.lock:
+            if k in self.done:
+                return False
+                
+            self.done.add(k)
+            self.in_flight.pop(k, None)
+            return True
+
+    def release(self, worker):
+        with self.lock:
+            lost = sorted(k for k, (w, _) in self.in_flight.items() if w == worker)
+            
+            for k in reversed(lost):
+                del self.in_flight[k]
+                self.pending.appendleft(k)
+                
+            return lost
+
+
+class Coordinator(object):
+    def __init__(self, renderer, address=("127.0.0.1", DEFAULT_PORT), authkey=None, tiles=None):
+        self.renderer = renderer
+        self.authkey = resolve_authkey(address, authkey)
+        self.tiles = tiles if tiles is not None else ParallelRenderer.tile_grid(renderer.width, renderer.height, renderer.tile_size)
+        self.scheduler = TileScheduler(self.tiles)
+        self.results = queue.Queue()
+        self.payload = scene_payload(renderer)
+        self.listener = Listener(address, authkey=self.authkey)
+        self.address = self.listener.address
+        self.active = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def local_address(self):
+        host, port = self.address
+        
+        return ("127.0.0.1" if host in ("0.0.0.0", "") else host, port)
+
+    def start(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, mp.AuthenticationError):
+                continue
+                
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        worker = id(conn)
+        
+        with self.lock:
+            self.active += 1
+            
+        try:
+            conn.recv()
+            conn.send_bytes(self.payload)
+            
+            while True:
+                message = conn.recv()
+                
+                if message[0] == "result":
+                    _, k, colors = message
+                    if self.scheduler.complete(k):
+                        self.results.put((k, colors))
+                        
+                if self.scheduler.finished():
+                    conn.send(("done",))
+                    break
+                    
+                k = self.scheduler.next(worker)
+                
+                if k is None:
+                    conn.send(("wait", WAIT_INTERVAL))
+                else:
+                    conn.send(("tile", k) + tuple(self.tiles[k]))
+        except (OSError, EOFError):
+            pass
+        finally:
+            self.scheduler.release(worker)
+            conn.close()
+            
+            with self.lock:
+                self.active -= 1
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+
+
+def run_worker(address, authkey=None, retries=CONNECT_RETRIES):
+    authkey = authkey if authkey is not None else authkey_from_env()
+    
+    if authkey is None:
+        raise ValueError(f"Worker requires the coordinator's authkey (--authkey or {AUTHKEY_ENV})")
+        
+    conn = None
+    
+    for _ in range(max(1, retries)):
+        try:
+            conn = Client(tuple(address), authkey=authkey)
+            break
+        except (ConnectionRefusedError, socket.timeout):
+            time.sleep(1.0)
+            
+    if conn is None:
+        return 0
+        
+    rendered = 0
+    
+    try:
+        conn.send(("hello", socket.gethostname(), os.getpid()))
+        renderer = pickle.loads(conn.recv_bytes())
+        tracer = Wavefront.WavefrontTracer(renderer) if renderer.mode in Wavefront.BATCH_MODES else None
+        conn.send(("ready",))
+        
+        while True:
+            message = conn.recv()
+            
+            if message[0] == "done":
+                break
+                
+            if message[0] == "wait":
+                time.sleep(message[1])
+                conn.send(("ready",))
+                continue
+                
+            _, k, x0, y0, x1, y1 = message
+            colors = renderer.render_tile(x0, y0, x1, y1, tracer)
+            conn.send(("result", k, np.asarray(colors, dtype=np.float32)))
+            rendered += 1
+    except (OSError, EOFError):
+        pass
+    finally:
+        conn.close()
+        
+    return rendered
+
+
+def start_local_workers(address, count, authkey=None):
+    ctx = mp.get_context()
+    procs = [ctx.Process(target=run_worker, args=(address, authkey), daemon=True) for _ in range(count)]
+    
+    for p in procs:
+        p.start()
+        
+    return procs
+
+
+def render(renderer, row_callback=None, checkpoint=None):
+    address, local_workers = renderer.distributed
+    
+    if checkpoint is not None:
+        todo = checkpoint.missing()
+        tiles = [checkpoint.tiles[k] for k in todo]
+    else:
+        tiles = ParallelRenderer.tile_grid(renderer.width, renderer.height, renderer.tile_size)
+        
+    if not tiles:
+        return
+        
+    coordinator = Coordinator(renderer, address, renderer.authkey, tiles)
+    procs = []
+    
+    try:
+        coordinator.start()
+        procs = start_local_workers(coordinator.local_address(), local_workers, coordinator.authkey)
+        
+        row_left = ParallelRenderer.row_counts(tiles, renderer.height)
+        remaining = len(tiles)
+        
+        while remaining:
+            try:
+                k, colors = coordinator.results.get(timeout=0.5)
+            except queue.Empty:
+                if procs and coordinator.active == 0 and all(p.exitcode is not None for p in procs):
+                    raise RuntimeError("All render workers exited unexpectedly")
+                continue
+                
+            remaining -= 1
+            x0, y0, x1, y1 = tiles[k]
+            renderer.store_tile(x0, y0, colors)
+            
+            if checkpoint is not None:
+                checkpoint.store(todo[k], colors)
+                
+            for j in range(y0, y1):
+                row_left[j] -= x1 - x0
+                if row_left[j] == 0 and row_callback:
+                    row_callback(j)
+    finally:
+        coordinator.close()
+        
+        for p in procs:
+            p.join(timeout=5.0)
+            if p.exitcode is None:
+                p.terminate()
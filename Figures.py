@@ -1,6 +1,13 @@
 import math
 import numpy as np
 from Interception import Intercept
+from BVH import BVH
+from MathLibrary import affine_matrix, dot_batch, normalize_batch
+
+
+BARY_EPSILON = 1e-7
+DET_EPSILON = 1e-7
+MESH_ARRAYS = ("v0", "edge1", "edge2", "normals", "edge_scale")
 
 
 def _norm(v):
@@ -9,13 +16,43 @@ def _norm(v):
     return v if norm_val == 0 else v / norm_val
 
 
+def _within(t, t_max):
+    if t_max is None:
+        return t
+        
+    return np.where(t < t_max, t, np.inf)
+
+
+def _no_uv(n):
+    return np.zeros((n, 2)), np.zeros(n, dtype=bool)
+
+
+def set_precision(obj, dtype):
+    for name, value in vars(obj).items():
+        if isinstance(value, np.ndarray) and value.dtype.kind == "f" and value.dtype != dtype:
+            setattr(obj, name, value.astype(dtype))
+            
+    if isinstance(obj, Instance):
+        set_precision(obj.shape, dtype)
+
+
+def batch_intersect(obj, orig, dirs, skip=None, t_max=None):
+    if hasattr(obj, "intersect_batch"):
+        return obj.intersect_batch(orig, dirs, skip, t_max)
+        
+    return obj.ray_intersect_batch(orig, dirs, t_max), None
+
+
 class Sphere:
     def __init__(self, position, radius, material):
         self.center = np.array(position, dtype=float)
         self.radius = float(radius)
         self.material = material
 
-    def ray_intersect(self, orig, direction):
+    def bounds(self):
+        return self.center - self.radius, self.center + self.radius
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf):
         l_vec = self.center - orig
         tca = np.dot(l_vec, direction)
         
@@ -28,9 +65,17 @@ class Sphere:
         thc = np.sqrt(r2 - d2)
         t0 = tca - thc
         t1 = tca + thc
-        t = t0 if t0 > 1e-4 else t1
+        t = t0 if t0 > t_min else t1
         
-        if t <= 1e-4:
+        if t <= t_min or t >= t_max:
+            return None
+            
+        return t
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        t = self.ray_distance(orig, direction, t_min, t_max)
+        
+        if t is None:
             return None
             
         point = orig + direction * t
@@ -38,6 +83,25 @@ class Sphere:
         
         return Intercept(point, normal, t, direction, self, uv=None)
 
+    def ray_intersect_batch(self, orig, dirs, t_max=None):
+        l_vec = self.center - orig
+        tca = dot_batch(l_vec, dirs)
+        
+        d2 = dot_batch(l_vec, l_vec) - tca * tca
+        r2 = self.radius * self.radius
+        
+        thc = np.sqrt(np.maximum(r2 - d2, 0.0))
+        t0 = tca - thc
+        t1 = tca + thc
+        t = np.where(t0 > 1e-4, t0, t1)
+        
+        return _within(np.where((d2 <= r2) & (t > 1e-4), t, np.inf), t_max)
+
+    def hit_batch(self, orig, dirs, t, prim=None):
+        point = orig + dirs * t[:, None]
+        
+        return point, normalize_batch(point - self.center), *_no_uv(len(t))
+
 
 class Plane:
     def __init__(self, position, normal, material, tex_scale=1.0):
@@ -46,7 +110,10 @@ class Plane:
         self.material = material
         self.tex_scale = float(tex_scale)
 
-    def ray_intersect(self, orig, direction):
+    def bounds(self):
+        return None
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf):
         denom = np.dot(direction, self.normal)
         
         if abs(denom) < 1e-6:
@@ -54,7 +121,15 @@ class Plane:
             
         t = np.dot(self.p0 - orig, self.normal) / denom
         
-        if t <= 1e-4:
+        if t <= t_min or t >= t_max:
+            return None
+            
+        return t
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        t = Plane.ray_distance(self, orig, direction, t_min, t_max)
+        
+        if t is None:
             return None
             
         point = orig + direction * t
@@ -70,6 +145,25 @@ class Plane:
             
         return Intercept(point, self.normal, t, direction, self, uv=uv)
 
+    def ray_intersect_batch(self, orig, dirs, t_max=None):
+        denom = dirs @ self.normal
+        valid = np.abs(denom) >= 1e-6
+        
+        t = ((self.p0 - orig) @ self.normal) / np.where(valid, denom, 1.0)
+        
+        return _within(np.where(valid & (t > 1e-4), t, np.inf), t_max)
+
+    def hit_batch(self, orig, dirs, t, prim=None):
+        point = orig + dirs * t[:, None]
+        normal = np.broadcast_to(self.normal, point.shape)
+        
+        if abs(self.normal[1]) > 0.9:
+            uv = point[:, [0, 2]] * self.tex_scale
+            uv = uv - np.floor(uv)
+            return point, normal, uv, np.ones(len(t), dtype=bool)
+            
+        return point, normal, *_no_uv(len(t))
+
 
 class Disk(Plane):
     def __init__(self, position, normal, radius, material):
@@ -77,8 +171,23 @@ class Disk(Plane):
         self.center = np.array(position, dtype=float)
         self.radius = float(radius)
 
-    def ray_intersect(self, orig, direction):
-        hit = super().ray_intersect(orig, direction)
+    def bounds(self):
+        extent = self.radius * np.sqrt(np.maximum(0.0, 1.0 - self.normal * self.normal))
+        return self.center - extent, self.center + extent
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        t = super().ray_distance(orig, direction, t_min, t_max)
+        
+        if t is None:
+            return None
+            
+        if np.linalg.norm(orig + direction * t - self.center) <= self.radius + 1e-6:
+            return t
+            
+        return None
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        hit = super().ray_intersect(orig, direction, t_min, t_max)
         
         if hit is None:
             return None
@@ -88,6 +197,15 @@ class Disk(Plane):
             
         return None
 
+    def ray_intersect_batch(self, orig, dirs, t_max=None):
+        t = Plane.ray_intersect_batch(self, orig, dirs)
+        hit = np.isfinite(t)
+        
+        point = orig + dirs * np.where(hit, t, 0.0)[:, None]
+        inside = np.linalg.norm(point - self.center, axis=1) <= self.radius + 1e-6
+        
+        return _within(np.where(hit & inside, t, np.inf), t_max)
+
 
 class Triangle:
     def __init__(self, a, b, c, material, uv_a=None, uv_b=None, uv_c=None):
@@ -101,7 +219,10 @@ class Triangle:
         self.uv_b = np.array(uv_b, dtype=float) if uv_b is not None else None
         self.uv_c = np.array(uv_c, dtype=float) if uv_c is not None else None
 
-    def ray_intersect(self, orig, direction):
+    def bounds(self):
+        return np.minimum(np.minimum(self.a, self.b), self.c), np.maximum(np.maximum(self.a, self.b), self.c)
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf):
         denom = np.dot(direction, self.normal)
         
         if abs(denom) < 1e-6:
@@ -109,7 +230,7 @@ class Triangle:
             
         t = np.dot(self.a - orig, self.normal) / denom
         
-        if t <= 1e-4:
+        if t <= t_min or t >= t_max:
             return None
             
         point = orig + t * direction
@@ -122,6 +243,15 @@ class Triangle:
             np.dot(self.normal, edge(self.c, self.a)) < -1e-6):
             return None
             
+        return t
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        t = self.ray_distance(orig, direction, t_min, t_max)
+        
+        if t is None:
+            return None
+            
+        point = orig + t * direction
         uv = None
         
         if self.uv_a is not None and self.uv_b is not None and self.uv_c is not None:
@@ -149,6 +279,52 @@ class Triangle:
             
         return Intercept(point, self.normal, t, direction, self, uv=uv)
 
+    def ray_intersect_batch(self, orig, dirs, t_max=None):
+        denom = dirs @ self.normal
+        valid = np.abs(denom) >= 1e-6
+        
+        t = ((self.a - orig) @ self.normal) / np.where(valid, denom, 1.0)
+        valid &= t > 1e-4
+        
+        point = orig + t[:, None] * dirs
+        
+        for p0, p1 in ((self.a, self.b), (self.b, self.c), (self.c, self.a)):
+            edge = np.cross(p1 - p0, point - p0)
+            valid &= (edge @ self.normal) >= -1e-6
+            
+        return _within(np.where(valid, t, np.inf), t_max)
+
+    def hit_batch(self, orig, dirs, t, prim=None):
+        point = orig + t[:, None] * dirs
+        normal = np.broadcast_to(self.normal, point.shape)
+        
+        if self.uv_a is None or self.uv_b is None or self.uv_c is None:
+            return point, normal, *_no_uv(len(t))
+            
+        v0 = self.b - self.a
+        v1 = self.c - self.a
+        v2 = point - self.a
+        
+        d00 = np.dot(v0, v0)
+        d01 = np.dot(v0, v1)
+        d11 = np.dot(v1, v1)
+        d20 = v2 @ v0
+        d21 = v2 @ v1
+        
+        denom_bary = d00 * d11 - d01 * d01
+        
+        if abs(denom_bary) > 1e-12:
+            inv_denom = 1.0 / denom_bary
+            v = (d11 * d20 - d01 * d21) * inv_denom
+            w = (d00 * d21 - d01 * d20) * inv_denom
+            u = 1.0 - v - w
+        else:
+            u = v = w = np.full(len(t), 1.0 / 3.0)
+            
+        uv = u[:, None] * self.uv_a + v[:, None] * self.uv_b + w[:, None] * self.uv_c
+        
+        return point, normal, uv, np.ones(len(t), dtype=bool)
+
 
 class AABB:
     def __init__(self, position, sizes, material):
@@ -156,11 +332,14 @@ class AABB:
         self.half = np.array(sizes, dtype=float) * 0.5
         self.material = material
 
-    def ray_intersect(self, orig, direction):
-        t_min = -np.inf
-        t_max = np.inf
-        normal_min = None
-        normal_max = None
+    def bounds(self):
+        return self.center - self.half, self.center + self.half
+
+    def _slabs(self, orig, direction):
+        t_near = -np.inf
+        t_far = np.inf
+        normal_near = None
+        normal_far = None
         
         for axis in range(3):
             min_plane = self.center[axis] - self.half[axis]
@@ -176,38 +355,59 @@ class AABB:
             t1 = (max_plane - orig[axis]) * inv_d
             
             if inv_d >= 0:
-                n0 = np.zeros(3)
-                n0[axis] = -1
-                n1 = np.zeros(3)
-                n1[axis] = 1
+                n0 = (axis, -1.0)
+                n1 = (axis, 1.0)
             else:
-                n0 = np.zeros(3)
-                n0[axis] = 1
-                n1 = np.zeros(3)
-                n1[axis] = -1
+                n0 = (axis, 1.0)
+                n1 = (axis, -1.0)
                 
             if t0 > t1:
                 t0, t1 = t1, t0
                 n0, n1 = n1, n0
                 
-            if t0 > t_min:
-                t_min = t0
-                normal_min = n0
+            if t0 > t_near:
+                t_near = t0
+                normal_near = n0
                 
-            if t1 < t_max:
-                t_max = t1
-                normal_max = n1
+            if t1 < t_far:
+                t_far = t1
+                normal_far = n1
                 
-            if t_min > t_max:
+            if t_near > t_far:
                 return None
                 
-        t = t_min if t_min > 1e-4 else t_max
+        return t_near, t_far, normal_near, normal_far
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        slabs = self._slabs(orig, direction)
+        
+        if slabs is None:
+            return None
+            
+        t_near, t_far, _, _ = slabs
+        t = t_near if t_near > t_min else t_far
+        
+        if t <= t_min or t >= t_max:
+            return None
+            
+        return t
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        slabs = self._slabs(orig, direction)
+        
+        if slabs is None:
+            return None
+            
+        t_near, t_far, normal_near, normal_far = slabs
+        t = t_near if t_near > t_min else t_far
         
-        if t <= 1e-4:
+        if t <= t_min or t >= t_max:
             return None
             
         point = orig + direction * t
-        normal = normal_min if t == t_min else normal_max
+        axis, sign = normal_near if t == t_near else normal_far
+        normal = np.zeros(3)
+        normal[axis] = sign
         
         min_corner = self.center - self.half
         max_corner = self.center + self.half
@@ -229,6 +429,55 @@ class AABB:
         
         return Intercept(point, normal, t, direction, self, uv=(u, v))
 
+    def _slabs_batch(self, orig, dirs):
+        min_plane = self.center - self.half
+        max_plane = self.center + self.half
+        
+        parallel = np.abs(dirs) < 1e-8
+        outside = parallel & ((orig < min_plane) | (orig > max_plane))
+        
+        inv_d = 1.0 / np.where(parallel, 1.0, dirs)
+        t0 = (min_plane - orig) * inv_d
+        t1 = (max_plane - orig) * inv_d
+        
+        t_near = np.where(parallel, -np.inf, np.minimum(t0, t1))
+        t_far = np.where(parallel, np.inf, np.maximum(t0, t1))
+        
+        axis_near = np.argmax(t_near, axis=1)
+        axis_far = np.argmin(t_far, axis=1)
+        rows = np.arange(len(dirs))
+        t_min = t_near[rows, axis_near]
+        t_max = t_far[rows, axis_far]
+        
+        t = np.where(t_min > 1e-4, t_min, t_max)
+        valid = ~outside.any(axis=1) & (t_min <= t_max) & (t > 1e-4)
+        
+        return np.where(valid, t, np.inf), t == t_min, axis_near, axis_far
+
+    def ray_intersect_batch(self, orig, dirs, t_max=None):
+        return _within(self._slabs_batch(orig, dirs)[0], t_max)
+
+    def hit_batch(self, orig, dirs, t, prim=None):
+        _, use_near, axis_near, axis_far = self._slabs_batch(orig, dirs)
+        point = orig + dirs * t[:, None]
+        
+        rows = np.arange(len(t))
+        axis = np.where(use_near, axis_near, axis_far)
+        
+        normal = np.zeros_like(point)
+        normal[rows, axis] = np.where(use_near, -1.0, 1.0)
+        
+        min_corner = self.center - self.half
+        extent = 2.0 * self.half
+        rel = (point - min_corner) / np.where(extent == 0, 1.0, extent)
+        
+        uv = np.where(
+            (axis == 0)[:, None], rel[:, [2, 1]],
+            np.where((axis == 1)[:, None], rel[:, [0, 2]], rel[:, [0, 1]]),
+        )
+        
+        return point, normal, np.clip(uv, 0.0, 1.0), np.ones(len(t), dtype=bool)
+
 
 class Cylinder:
     def __init__(self, center, axis, radius, height, material):
@@ -250,7 +499,13 @@ class Cylinder:
         self.u_vec = _norm(np.cross(self.axis, tmp))
         self.v_vec = _norm(np.cross(self.axis, self.u_vec))
 
-    def ray_intersect(self, orig, direction):
+    def bounds(self):
+        extent = self.radius * np.sqrt(np.maximum(0.0, 1.0 - self.axis * self.axis))
+        lo = np.minimum(self.bottom, self.top) - extent
+        hi = np.maximum(self.bottom, self.top) + extent
+        return lo, hi
+
+    def _nearest(self, orig, direction, t_min, t_max):
         oc = orig - self.center
         
         dir_parallel = np.dot(direction, self.axis) * self.axis
@@ -271,38 +526,79 @@ class Cylinder:
         if abs(a) < 1e-8:
             if c > 0:
                 return None
-            return self._intersect_caps(orig, direction)
+            cap = self._nearest_cap(orig, direction, t_min, t_max)
+            return None if cap is None else (cap[0], cap[1], False)
             
         sqrt_disc = np.sqrt(discriminant)
         t1 = (-b - sqrt_disc) / (2 * a)
         t2 = (-b + sqrt_disc) / (2 * a)
         
-        candidates = []
+        best = None
         
         for t in [t1, t2]:
-            if t <= 1e-4:
+            if t <= t_min or t >= t_max:
                 continue
                 
             point = orig + direction * t
             height_param = np.dot(point - self.center, self.axis)
             
-            if abs(height_param) <= self.height * 0.5:
-                center_to_point = point - self.center
-                normal_component = center_to_point - np.dot(center_to_point, self.axis) * self.axis
-                normal = _norm(normal_component)
-                candidates.append((t, point, normal))
+            if abs(height_param) <= self.height * 0.5 and (best is None or t < best[0]):
+                best = (t, None)
                 
-        cap_result = self._intersect_caps(orig, direction)
+        cap = self._nearest_cap(orig, direction, t_min, t_max)
         
-        if cap_result is not None:
-            candidates.append((cap_result.distance, cap_result.point, cap_result.normal))
+        if cap is not None and (best is None or cap[0] < best[0]):
+            best = cap
+            
+        if best is None:
+            return None
+            
+        return best[0], best[1], True
+
+    def _nearest_cap(self, orig, direction, t_min, t_max):
+        best = None
+        
+        for cap_center, cap_normal in [(self.bottom, -self.axis), (self.top, self.axis)]:
+            denom = np.dot(direction, cap_normal)
+            
+            if abs(denom) < 1e-6:
+                continue
+                
+            t = np.dot(cap_center - orig, cap_normal) / denom
+            
+            if t <= t_min or t >= t_max:
+                continue
+                
+            point = orig + direction * t
+            dist_from_center = np.linalg.norm(point - cap_center)
             
-        if not candidates:
+            if dist_from_center <= self.radius and (best is None or t < best[0]):
+                best = (t, cap_normal)
+                
+        return best
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        nearest = self._nearest(orig, direction, t_min, t_max)
+        
+        return None if nearest is None else nearest[0]
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf):
+        nearest = self._nearest(orig, direction, t_min, t_max)
+        
+        if nearest is None:
             return None
             
-        candidates.sort(key=lambda x: x[0])
-        t, point, normal = candidates[0]
+        t, normal, with_uv = nearest
+        point = orig + direction * t
         
+        if normal is None:
+            center_to_point = point - self.center
+            normal_component = center_to_point - np.dot(center_to_point, self.axis) * self.axis
+            normal = _norm(normal_component)
+            
+        if not with_uv:
+            return Intercept(point, normal, t, direction, self, uv=None)
+            
         rel = point - self.center
         x_val = float(np.dot(rel, self.u_vec))
         y_val = float(np.dot(rel, self.v_vec))
@@ -317,30 +613,301 @@ class Cylinder:
         
         return Intercept(point, normal, t, direction, self, uv=(u, v))
 
-    def _intersect_caps(self, orig, direction):
-        candidates = []
+    def _candidates_batch(self, orig, dirs):
+        oc = orig - self.center
         
-        for cap_center, cap_normal in [(self.bottom, -self.axis), (self.top, self.axis)]:
-            denom = np.dot(direction, cap_normal)
+        dir_perp = dirs - (dirs @ self.axis)[:, None] * self.axis
+        oc_perp = oc - (oc @ self.axis)[:, None] * self.axis
+        
+        a = dot_batch(dir_perp, dir_perp)
+        b = 2.0 * dot_batch(oc_perp, dir_perp)
+        c = dot_batch(oc_perp, oc_perp) - self.radius * self.radius
+        
+        discriminant = b * b - 4 * a * c
+        parallel = np.abs(a) < 1e-8
+        
+        side_ok = (discriminant >= 0) & ~parallel
+        caps_ok = (discriminant >= 0) & ~(parallel & (c > 0))
+        
+        sqrt_disc = np.sqrt(np.maximum(discriminant, 0.0))
+        safe_a = np.where(parallel, 1.0, a)
+        
+        best_t = np.full(len(dirs), np.inf)
+        best_kind = np.zeros(len(dirs), dtype=np.int8)
+        
+        for t in ((-b - sqrt_disc) / (2 * safe_a), (-b + sqrt_disc) / (2 * safe_a)):
+            point = orig + dirs * t[:, None]
+            height_param = (point - self.center) @ self.axis
+            ok = side_ok & (t > 1e-4) & (np.abs(height_param) <= self.height * 0.5) & (t < best_t)
+            best_t = np.where(ok, t, best_t)
+            best_kind = np.where(ok, 1, best_kind)
             
-            if abs(denom) < 1e-6:
-                continue
+        for kind, (cap_center, cap_normal) in ((2, (self.bottom, -self.axis)), (3, (self.top, self.axis))):
+            denom = dirs @ cap_normal
+            valid = caps_ok & (np.abs(denom) >= 1e-6)
+            t = ((cap_center - orig) @ cap_normal) / np.where(valid, denom, 1.0)
+            point = orig + dirs * t[:, None]
+            inside = np.linalg.norm(point - cap_center, axis=1) <= self.radius
+            ok = valid & (t > 1e-4) & inside & (t < best_t)
+            best_t = np.where(ok, t, best_t)
+            best_kind = np.where(ok, kind, best_kind)
+            
+        return best_t, best_kind, parallel
+
+    def ray_intersect_batch(self, orig, dirs, t_max=None):
+        return _within(self._candidates_batch(orig, dirs)[0], t_max)
+
+    def hit_batch(self, orig, dirs, t, prim=None):
+        _, kind, parallel = self._candidates_batch(orig, dirs)
+        point = orig + dirs * t[:, None]
+        
+        rel = point - self.center
+        side_normal = normalize_batch(rel - (rel @ self.axis)[:, None] * self.axis)
+        normal = np.where((kind == 1)[:, None], side_normal, np.where((kind == 2)[:, None], -self.axis, self.axis))
+        
+        theta = np.arctan2(rel @ self.v_vec, rel @ self.u_vec)
+        u = (theta / (2.0 * math.pi)) % 1.0
+        v = ((rel @ self.axis) / self.height) + 0.5
+        uv = np.clip(np.stack((u, v), axis=1), 0.0, 1.0)
+        
+        return point, normal, uv, ~parallel
+
+
+class TriangleMesh:
+    def __init__(self, vertices, faces, material, uvs=None, face_uvs=None, leaf_size=8, prebuilt=None):
+        self.vertices = np.ascontiguousarray(vertices, dtype=float).reshape(-1, 3)
+        self.faces = np.ascontiguousarray(faces, dtype=np.int64).reshape(-1, 3)
+        self.material = material
+        
+        self.uvs = np.ascontiguousarray(uvs, dtype=float).reshape(-1, 2) if uvs is not None else None
+        
+        if self.uvs is not None and face_uvs is not None:
+            self.face_uvs = np.ascontiguousarray(face_uvs, dtype=np.int64).reshape(-1, 3)
+            self.has_uv = (self.face_uvs >= 0).all(axis=1)
+        else:
+            self.face_uvs = None
+            self.has_uv = np.zeros(len(self.faces), dtype=bool)
+            
+        if prebuilt is not None:
+            self._load_prebuilt(prebuilt, leaf_size)
+        else:
+            self._build(leaf_size)
+
+    def _load_prebuilt(self, prebuilt, leaf_size):
+        for name in MESH_ARRAYS:
+            setattr(self, name, prebuilt[name])
+            
+        self.bvh = BVH.from_arrays({name[4:]: arr for name, arr in prebuilt.items() if name.startswith("bvh.")}, leaf_size=leaf_size)
+
+    def _build(self, leaf_size):
+        a = self.vertices[self.faces[:, 0]]
+        b = self.vertices[self.faces[:, 1]]
+        c = self.vertices[self.faces[:, 2]]
+        
+        self.v0 = np.ascontiguousarray(a)
+        self.edge1 = np.ascontiguousarray(b - a)
+        self.edge2 = np.ascontiguousarray(c - a)
+        
+        cross = np.cross(self.edge1, self.edge2)
+        area2 = np.linalg.norm(cross, axis=1)
+        self.normals = cross / np.where(area2 == 0, 1.0, area2)[:, None]
+        self.edge_scale = np.linalg.norm(self.edge1, axis=1) * np.linalg.norm(self.edge2, axis=1)
+        
+        self.bvh = BVH(np.minimum(np.minimum(a, b), c), np.maximum(np.maximum(a, b), c), leaf_size=leaf_size)
+
+    def prebuilt_arrays(self):
+        arrays = {name: getattr(self, name) for name in MESH_ARRAYS}
+        arrays.update((f"bvh.{name}", arr) for name, arr in self.bvh.arrays().items())
+        
+        return arrays
+
+    def __len__(self):
+        return len(self.faces)
+
+    def bounds(self):
+        if not len(self.faces):
+            return None
+            
+        return self.bvh.node_min[0], self.bvh.node_max[0]
+
+    def _moller_trumbore(self, orig, direction, prims, t_min=1e-4):
+        v0 = self.v0[prims]
+        e1 = self.edge1[prims]
+        e2 = self.edge2[prims]
+        
+        pvec = np.cross(direction, e2)
+        det = np.sum(e1 * pvec, axis=-1)
+        valid = np.abs(det) > DET_EPSILON * self.edge_scale[prims]
+        inv_det = 1.0 / np.where(valid, det, 1.0)
+        
+        tvec = orig - v0
+        u = np.sum(tvec * pvec, axis=-1) * inv_det
+        
+        qvec = np.cross(tvec, e1)
+        v = np.sum(direction * qvec, axis=-1) * inv_det
+        t = np.sum(e2 * qvec, axis=-1) * inv_det
+        
+        valid &= (u >= -BARY_EPSILON) & (v >= -BARY_EPSILON) & (u + v <= 1.0 + BARY_EPSILON) & (t > t_min)
+        
+        return np.where(valid, t, np.inf), u, v
+
+    def _interpolate_uv(self, prims, u, v):
+        uv_a = self.uvs[self.face_uvs[prims, 0]]
+        uv_b = self.uvs[self.face_uvs[prims, 1]]
+        uv_c = self.uvs[self.face_uvs[prims, 2]]
+        
+        return (1.0 - u - v)[..., None] * uv_a + u[..., None] * uv_b + v[..., None] * uv_c
+
+    def _nearest(self, orig, direction, t_min, t_max, ignore_prim):
+        best = [t_max, -1, 0.0, 0.0]
+        
+        def visit(prims, t_limit):
+            prims = np.asarray(prims)
+            t, u, v = self._moller_trumbore(orig, direction, prims, t_min)
+            
+            if ignore_prim is not None:
+                t[prims == ignore_prim] = np.inf
                 
-            t = np.dot(cap_center - orig, cap_normal) / denom
+            k = int(np.argmin(t))
             
-            if t <= 1e-4:
-                continue
+            if t[k] < best[0]:
+                best[:] = [float(t[k]), int(prims[k]), float(u[k]), float(v[k])]
                 
-            point = orig + direction * t
-            dist_from_center = np.linalg.norm(point - cap_center)
+            return best[0]
+            
+        self.bvh.traverse(orig, direction, visit, t_max)
+        
+        return best
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf, ignore_prim=None):
+        t, prim, _, _ = self._nearest(orig, direction, t_min, t_max, ignore_prim)
+        
+        return None if prim < 0 else t
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf, ignore_prim=None):
+        t, prim, u, v = self._nearest(orig, direction, t_min, t_max, ignore_prim)
+        
+        if prim < 0:
+            return None
+            
+        point = orig + direction * t
+        uv = None
+        
+        if self.has_uv[prim]:
+            uv = self._interpolate_uv(prim, np.float64(u), np.float64(v))
+            
+        return Intercept(point, self.normals[prim], t, direction, self, uv=uv, prim=prim)
+
+    def intersect_batch(self, orig, dirs, skip=None, t_max=None):
+        best_t = np.full(len(dirs), np.inf, dtype=dirs.dtype) if t_max is None else np.array(t_max, dtype=dirs.dtype)
+        best_prim = np.full(len(dirs), -1, dtype=np.int64)
+        
+        def visit(prims, rays):
+            t, _, _ = self._moller_trumbore(orig[rays, None, :], dirs[rays, None, :], prims[None, :])
             
-            if dist_from_center <= self.radius:
-                candidates.append((t, point, cap_normal))
+            if skip is not None:
+                t[skip[rays, None] == prims[None, :]] = np.inf
                 
-        if not candidates:
+            j = np.argmin(t, axis=1)
+            t_hit = t[np.arange(len(rays)), j]
+            closer = t_hit < best_t[rays]
+            best_t[rays[closer]] = t_hit[closer]
+            best_prim[rays[closer]] = prims[j[closer]]
+            
+        self.bvh.traverse_batch(orig, dirs, best_t, visit)
+        
+        return np.where(best_prim >= 0, best_t, np.inf), best_prim
+
+    def hit_batch(self, orig, dirs, t, prim):
+        point = orig + dirs * t[:, None]
+        normal = self.normals[prim]
+        uv = np.zeros((len(t), 2), dtype=dirs.dtype)
+        has_uv = self.has_uv[prim]
+        
+        if has_uv.any():
+            sel = np.nonzero(has_uv)[0]
+            _, u, v = self._moller_trumbore(orig[sel], dirs[sel], prim[sel])
+            uv[sel] = self._interpolate_uv(prim[sel], u, v)
+            
+        return point, normal, uv, has_uv
+
+
+class Instance:
+    def __init__(self, shape, material=None, translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0), scale=1.0, matrix=None):
+        self.shape = shape
+        self.material = material if material is not None else shape.material
+        self.set_transform(translate, rotate, scale, matrix)
+
+    def set_transform(self, translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0), scale=1.0, matrix=None):
+        self.matrix = np.array(matrix, dtype=float) if matrix is not None else affine_matrix(translate, rotate, scale)
+        self.inverse = np.linalg.inv(self.matrix)
+        
+        self.linear = self.matrix[:3, :3]
+        self.offset = self.matrix[:3, 3]
+        self.inv_linear = self.inverse[:3, :3]
+        self.inv_offset = self.inverse[:3, 3]
+        self.normal_matrix = self.inv_linear.T
+
+    def __len__(self):
+        return len(self.shape) if hasattr(self.shape, "__len__") else 1
+
+    def bounds(self):
+        box = self.shape.bounds() if hasattr(self.shape, "bounds") else None
+        
+        if box is None:
             return None
             
-        candidates.sort(key=lambda x: x[0])
-        t, point, normal = candidates[0]
+        lo, hi = box
+        corners = np.array([(x, y, z) for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+        corners = corners @ self.linear.T + self.offset
+        
+        return corners.min(axis=0), corners.max(axis=0)
+
+    def to_object(self, orig, direction):
+        local_orig = orig @ self.inv_linear.T + self.inv_offset
+        local_dir = direction @ self.inv_linear.T
+        scale = np.linalg.norm(local_dir, axis=-1)
+        
+        return local_orig, local_dir / np.where(scale == 0, 1.0, scale)[..., None], scale
+
+    def to_world_normal(self, normal):
+        normal = normal @ self.normal_matrix.T
+        
+        return normal / (np.linalg.norm(normal, axis=-1, keepdims=True) + 1e-8)
+
+    def ray_distance(self, orig, direction, t_min=1e-4, t_max=np.inf, ignore_prim=None):
+        local_orig, local_dir, scale = self.to_object(orig, direction)
+        
+        if ignore_prim is not None:
+            t = self.shape.ray_distance(local_orig, local_dir, t_min * scale, t_max * scale, ignore_prim=ignore_prim)
+        else:
+            t = self.shape.ray_distance(local_orig, local_dir, t_min * scale, t_max * scale)
+            
+        return None if t is None else t / scale
+
+    def ray_intersect(self, orig, direction, t_min=1e-4, t_max=np.inf, ignore_prim=None):
+        local_orig, local_dir, scale = self.to_object(orig, direction)
+        
+        if ignore_prim is not None:
+            hit = self.shape.ray_intersect(local_orig, local_dir, t_min * scale, t_max * scale, ignore_prim=ignore_prim)
+        else:
+            hit = self.shape.ray_intersect(local_orig, local_dir, t_min * scale, t_max * scale)
+            
+        if hit is None:
+            return None
+            
+        t = hit.distance / scale
+        
+        return Intercept(orig + direction * t, self.to_world_normal(hit.normal), t, direction, self, uv=hit.uv, prim=hit.prim)
+
+    def intersect_batch(self, orig, dirs, skip=None, t_max=None):
+        local_orig, local_dirs, scale = self.to_object(orig, dirs)
+        t, prim = batch_intersect(self.shape, local_orig, local_dirs, skip, None if t_max is None else t_max * scale)
+        
+        return t / scale, prim
+
+    def hit_batch(self, orig, dirs, t, prim=None):
+        local_orig, local_dirs, scale = self.to_object(orig, dirs)
+        _, normal, uv, has_uv = self.shape.hit_batch(local_orig, local_dirs, t * scale, prim)
         
-        return Intercept(point, normal, t, direction, self, uv=None)
\ No newline at end of file
+        return orig + dirs * t[:, None], self.to_world_normal(normal), uv, has_uv
@@ -0,0 +1,122 @@
+import numpy as np
+import Wavefront
+
+
+class GBuffer(object):
+    def __init__(self, renderer, region=None, tracer=None):
+        s = renderer.ssaa
+        self.x0, self.y0, self.x1, self.y1 = region if region is not None else (0, 0, renderer.width, renderer.height)
+        h_hr = (self.y1 - self.y0) * s
+        w_hr = (self.x1 - self.x0) * s
+        
+        dtype = renderer.dtype
+        self.key = self.view_key(renderer)
+        self.point = np.zeros((h_hr, w_hr, 3), dtype=dtype)
+        self.normal = np.zeros((h_hr, w_hr, 3), dtype=dtype)
+        self.uv = np.zeros((h_hr, w_hr, 2), dtype=dtype)
+        self.has_uv = np.zeros((h_hr, w_hr), dtype=bool)
+        self.dirs = np.zeros((h_hr, w_hr, 3), dtype=dtype)
+        self.ids = np.full((h_hr, w_hr), -1, dtype=int)
+        self.prims = np.full((h_hr, w_hr), -1, dtype=np.int64)
+        
+        self.capture(renderer, tracer)
+
+    @staticmethod
+    def view_key(renderer):
+        return (
+            renderer.width,
+            renderer.height,
+            renderer.ssaa,
+            float(renderer.tan_fov),
+            tuple(np.asarray(renderer.cam_pos, dtype=float).tolist()),
+            tuple(id(obj) for obj in renderer.objects),
+            renderer.geometry_version,
+            tuple(obj.matrix.tobytes() for obj in renderer.objects if hasattr(obj, "matrix")),
+        )
+
+    def matches(self, renderer):
+        return self.key == self.view_key(renderer)
+
+    def _slices(self, renderer, x0, y0, x1, y1):
+        s = renderer.ssaa
+        
+        return slice((y0 - self.y0) * s, (y1 - self.y0) * s), slice((x0 - self.x0) * s, (x1 - self.x0) * s)
+
+    def tiles(self, renderer):
+        tile = renderer.tile_size
+        
+        for y0 in range(self.y0, self.y1, tile):
+            y1 = min(y0 + tile, self.y1)
+            yield y0, y1, [(x0, y0, min(x0 + tile, self.x1), y1) for x0 in range(self.x0, self.x1, tile)]
+
+    def capture(self, renderer, tracer=None):
+        tracer = tracer if tracer is not None else Wavefront.WavefrontTracer(renderer)
+        
+        for _, _, row in self.tiles(renderer):
+            for x0, y0, x1, y1 in row:
+                orig, dirs = tracer.primary_rays(x0, y0, x1, y1)
+                dirs = dirs / (np.linalg.norm(dirs, axis=1, keepdims=True) + 1e-8)
+                t, ids, prims = tracer.intersect(orig, dirs)
+                hit = np.nonzero(ids >= 0)[0]
+                
+                point = np.zeros((len(dirs), 3), dtype=dirs.dtype)
+                normal = np.zeros((len(dirs), 3), dtype=dirs.dtype)
+                uv = np.zeros((len(dirs), 2), dtype=dirs.dtype)
+                has_uv = np.zeros(len(dirs), dtype=bool)
+                
+                if hit.size:
+                    point[hit], normal[hit], uv[hit], has_uv[hit] = tracer.finalize(orig[hit], dirs[hit], t[hit], ids[hit], prims[hit])
+                    
+                rows, cols = self._slices(renderer, x0, y0, x1, y1)
+                shape = (rows.stop - rows.start, cols.stop - cols.start)
+                self.point[rows, cols] = point.reshape(shape + (3,))
+                self.normal[rows, cols] = normal.reshape(shape + (3,))
+                self.uv[rows, cols] = uv.reshape(shape + (2,))
+                self.has_uv[rows, cols] = has_uv.reshape(shape)
+                self.dirs[rows, cols] = dirs.reshape(shape + (3,))
+                self.ids[rows, cols] = ids.reshape(shape)
+                self.prims[rows, cols] = prims.reshape(shape)
+
+    def shade_tile(self, renderer, tracer, x0, y0, x1, y1):
+        rows, cols = self._slices(renderer, x0, y0, x1, y1)
+        dirs = self.dirs[rows, cols].reshape(-1, 3)
+        ids = self.ids[rows, cols].ravel()
+        colors = np.empty((len(dirs), 3), dtype=dirs.dtype)
+        
+        miss = ids < 0
+        if miss.any():
+            colors[miss] = tracer.env_colors(dirs[miss])
+            
+        hit = np.nonzero(~miss)[0]
+        if hit.size:
+            colors[hit] = tracer.shade_surface(
+                self.point[rows, cols].reshape(-1, 3)[hit],
+                self.normal[rows, cols].reshape(-1, 3)[hit],
+                self.uv[rows, cols].reshape(-1, 2)[hit],
+                self.has_uv[rows, cols].ravel()[hit],
+                dirs[hit],
+                ids[hit],
+                self.prims[rows, cols].ravel()[hit],
+                0,
+                np.ones(hit.size, dtype=dirs.dtype),
+            )
+            
+        return tracer.downsample(colors, x1 - x0, y1 - y0)
+
+    def shade(self, renderer, row_callback=None, tracer=None):
+        tracer = tracer if tracer is not None else Wavefront.WavefrontTracer(renderer)
+        
+        for y0, y1, row in self.tiles(renderer):
+            for x0, _, x1, _ in row:
+                renderer.seed_tile(x0, y0)
+                renderer.store_tile(x0, y0, self.shade_tile(renderer, tracer, x0, y0, x1, y1))
+                
+            if row_callback:
+                for j in range(y0, y1):
+                    row_callback(j)
+
+
+def render_tile(renderer, x0, y0, x1, y1, tracer=None):
+    tracer = tracer if tracer is not None else Wavefront.WavefrontTracer(renderer)
+    
+    return GBuffer(renderer, (x0, y0, x1, y1), tracer).shade_tile(renderer, tracer, x0, y0, x1, y1)
@@ -1,7 +1,22 @@
 import numpy as np
-from PIL import Image
 import os
+import time
 import contextlib
+import Wavefront
+import ParallelRenderer
+import AdaptiveSampler
+import ImageOutput
+import TextureCache
+import Checkpoint
+import GBuffer
+import Sequence
+import Distributed
+from BVH import BVH
+from Figures import set_precision
+from Lights import compile_lights
+from RenderStats import RenderStats
+SURFACE_BIAS = 1e-3
+BIAS_ULPS = 256
 try:
     with open(os.devnull, 'w') as devnull:
         with contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
@@ -11,171 +26,428 @@ except Exception:
     _HAS_PYGAME = False
 
 class Renderer:
-    def __init__(self, width, height, fov=60, bg_color=(0, 0, 0), ssaa=1):
+    def __init__(self, width, height, fov=60, bg_color=(0, 0, 0), ssaa=1, mode="scalar", tile_size=32, workers=1, aa="grid", aa_samples=16, aa_threshold=0.1, precision="float64", framebuffer_path=None):
         self.width = int(width)
         self.height = int(height)
         self.aspect = self.width / self.height
         self.fov = np.deg2rad(fov)
         self.tan_fov = np.tan(self.fov * 0.5)
-        self.framebuffer = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.framebuffer_path = framebuffer_path
+        if framebuffer_path:
+            self.framebuffer = ImageOutput.open_framebuffer(framebuffer_path, self.width, self.height)
+        else:
+            self.framebuffer = np.zeros((self.height, self.width, 3), dtype=np.uint8)
         self.ssaa = int(ssaa) if ssaa >= 1 else 1
         self.cam_pos = np.array((0.0, 0.0, 0.0), dtype=float)
         self.bg_color = np.array(bg_color, dtype=float)
         self.objects = []
         self.lights = []
         self.max_depth = 3
+        self.min_weight = 1.0 / 512
+        self.roulette = False
+        self.roulette_threshold = 0.25
+        self.roulette_seed = 0
+        self.rng = np.random.default_rng(self.roulette_seed)
         self.env = None
         self.env_yaw = 0.0
         self.env_vflip = False
+        self.mode = mode
+        self.tile_size = max(1, int(tile_size))
+        self.workers = int(workers) if workers else (os.cpu_count() or 1)
+        self.aa = aa
+        self.aa_samples = max(1, int(aa_samples))
+        self.aa_threshold = float(aa_threshold)
+        self.precision = precision
+        self.dtype = np.float32 if precision == "float32" else np.float64
+        self.surface_bias = SURFACE_BIAS
+        self.outputs = []
+        self._writers = []
+        self.checkpoint_path = None
+        self.resume = False
+        self.checkpoint = None
+        self.keep_gbuffer = False
+        self.gbuffer = None
+        self.distributed = None
+        self.authkey = None
+        self.stats = None
+        self.bvh = None
+        self.unbounded = []
+        self._accel_count = -1
+        self.geometry_version = 0
+        self._light_table = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_writers"] = []
+        state["checkpoint"] = None
+        state["gbuffer"] = None
+        if self.framebuffer_path:
+            state["framebuffer"] = None
+        return state
 
     @staticmethod
     def _to_u8(color01):
-        return (np.clip(color01, 0.0, 1.0) * 255).astype(np.uint8)
+        return ImageOutput.to_u8(color01)
+
+    def enable_stats(self):
+        self.stats = RenderStats()
+        return self.stats
+
+    def disable_stats(self):
+        stats, self.stats = self.stats, None
+        return stats
+
+    def seed_tile(self, x0, y0):
+        self.rng = np.random.default_rng((self.roulette_seed, x0, y0))
+
+    def path_survival(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        scale = (weights >= self.min_weight).astype(float)
+        if self.roulette:
+            low = np.nonzero((scale > 0.0) & (weights < self.roulette_threshold))[0]
+            if low.size:
+                p = weights[low] / self.roulette_threshold
+                scale[low] = np.where(self.rng.random(low.size) < p, 1.0 / p, 0.0)
+        return scale
+
+    def add_output(self, path):
+        ImageOutput.writer_for(path)
+        self.outputs.append(path)
+
+    def store_tile(self, x0, y0, colors):
+        h, w = colors.shape[:2]
+        self.framebuffer[y0:y0 + h, x0:x0 + w] = self._to_u8(colors)
+        self.emit_tile(x0, y0, colors)
+
+    def enable_gbuffer(self):
+        self.keep_gbuffer = True
+
+    def disable_gbuffer(self):
+        self.keep_gbuffer = False
+        self.gbuffer = None
+
+    def enable_distributed(self, address=("127.0.0.1", Distributed.DEFAULT_PORT), local_workers=0, authkey=None):
+        self.authkey = Distributed.resolve_authkey(tuple(address), authkey)
+        self.distributed = (tuple(address), int(local_workers))
+
+    def disable_distributed(self):
+        self.distributed = None
+
+    def enable_checkpoint(self, path, resume=False):
+        self.checkpoint_path = path
+        self.resume = bool(resume)
+
+    def open_checkpoint(self):
+        if self.checkpoint is None and self.checkpoint_path:
+            self.ensure_acceleration()
+            self.checkpoint = Checkpoint.Checkpoint(self.checkpoint_path, self, self.resume)
+        return self.checkpoint
+
+    def emit_tile(self, x0, y0, colors):
+        for writer in self._writers:
+            writer.write_tile(x0, y0, colors)
 
     def add_object(self, obj):
         self.objects.append(obj)
+        self._accel_count = -1
+
+    def build_acceleration(self):
+        start = time.perf_counter()
+        bounded = []
+        lo = []
+        hi = []
+        self.unbounded = []
+        for k, obj in enumerate(self.objects):
+            set_precision(obj, self.dtype)
+            box = obj.bounds() if hasattr(obj, "bounds") else None
+            if box is None:
+                self.unbounded.append(k)
+                continue
+            bounded.append(k)
+            lo.append(box[0])
+            hi.append(box[1])
+        self.bvh = BVH(lo, hi, prim_ids=bounded) if bounded else None
+        extent = max([float(np.abs(self.cam_pos).max())] + [float(np.abs(b).max()) for b in lo + hi])
+        self.surface_bias = max(SURFACE_BIAS, BIAS_ULPS * float(np.finfo(self.dtype).eps) * extent)
+        self._accel_count = len(self.objects)
+        if self.stats is not None:
+            self.stats.add_time("acceleration", time.perf_counter() - start)
+
+    def invalidate_acceleration(self):
+        self._accel_count = -1
+        self.geometry_version += 1
+
+    def ensure_acceleration(self):
+        if self._accel_count != len(self.objects):
+            self.build_acceleration()
+
+    def clear_scene(self):
+        self.objects = []
+        self.lights = []
+        self.env = None
+        self.bvh = None
+        self.unbounded = []
+        self._accel_count = -1
+        self._light_table = None
+        self.gbuffer = None
 
     def add_light(self, light):
         self.lights.append(light)
+        self._light_table = None
+
+    def compile_lights(self):
+        self._light_table = compile_lights(self.lights, self.dtype)
+        return self._light_table
 
-    def _rot_y(self, v, yaw_rad):
-        cy, sy = np.cos(yaw_rad), np.sin(yaw_rad)
-        x, y, z = v
-        return np.array([cy * x + sy * z, y, -sy * x + cy * z], dtype=float)
+    def light_table(self):
+        if self._light_table is None:
+            return self.compile_lights()
+        return self._light_table
 
     def load_env_map(self, path, yaw_deg=0.0, vflip=False):
         try:
-            img = Image.open(path).convert("RGB")
-            self.env = np.asarray(img).astype(np.float32) / 255.0
+            self.env = TextureCache.load_texture(path)
             self.env_yaw = float(yaw_deg)
             self.env_vflip = bool(vflip)
         except Exception:
             self.env = None
 
-    def _sample_env_bilinear(self, u, v):
+    def env_transform(self):
+        u_offset = 0.5 + self.env_yaw / 360.0
+        v_scale = 1.0 / np.pi if self.env_vflip else -1.0 / np.pi
+        return u_offset, 0.5 / np.pi, v_scale
+
+    def sample_env(self, directions):
+        d = np.asarray(directions, dtype=float).reshape(-1, 3)
+        if self.env is None:
+            return np.broadcast_to(self.bg_color, d.shape)
+        start = time.perf_counter()
         h, w, _ = self.env.shape
-        u = (u % 1.0) * w
-        v = np.clip(v, 0.0, 0.999999) * h
-        x0 = int(np.floor(u)) % w
-        y0 = int(np.floor(v)) % h
-        x1 = (x0 + 1) % w
-        y1 = min(y0 + 1, h - 1)
-        sx = u - np.floor(u)
-        sy = v - np.floor(v)
-        c00 = self.env[y0, x0]
-        c10 = self.env[y0, x1]
-        c01 = self.env[y1, x0]
-        c11 = self.env[y1, x1]
-        c0 = c00 * (1 - sx) + c10 * sx
-        c1 = c01 * (1 - sx) + c11 * sx
-        return c0 * (1 - sy) + c1 * sy
+        u_offset, u_scale, v_scale = self.env_transform()
+        norm = np.sqrt(np.einsum("ij,ij->i", d, d)) + 1e-8
+        u = (u_offset + np.arctan2(-d[:, 2], d[:, 0]) * u_scale) % 1.0 * w
+        v = np.clip(0.5 + np.arcsin(np.clip(d[:, 1] / norm, -1, 1)) * v_scale, 0.0, 0.999999) * h
+        fu = np.floor(u)
+        fv = np.floor(v)
+        x0 = fu.astype(np.intp) % w
+        x1 = x0 + 1
+        x1[x1 == w] = 0
+        row0 = fv.astype(np.intp) * w
+        row1 = np.minimum(row0 + w, (h - 1) * w)
+        sx = (u - fu).astype(np.float32)[:, None]
+        sy = (v - fv).astype(np.float32)[:, None]
+        texels = self.env.reshape(-1, 3)
+        c0 = texels[row0 + x0] * (1 - sx) + texels[row0 + x1] * sx
+        c1 = texels[row1 + x0] * (1 - sx) + texels[row1 + x1] * sx
+        colors = (c0 * (1 - sy) + c1 * sy) * np.float32(1.0 / 255.0)
+        if self.stats is not None:
+            self.stats.add_time("env", time.perf_counter() - start, len(d))
+        return colors
 
     def get_env_map_color(self, point, direction):
         if self.env is None:
             return tuple(self.bg_color)
-        d = np.array(direction, dtype=float)
-        d /= (np.linalg.norm(d) + 1e-8)
-        if self.env_yaw != 0.0:
-            d = self._rot_y(d, np.deg2rad(self.env_yaw))
-        u = 0.5 + np.arctan2(-d[2], d[0]) / (2 * np.pi)
-        v = 0.5 - np.arcsin(np.clip(d[1], -1, 1)) / np.pi
-        if self.env_vflip:
-            v = 1.0 - v
-        return tuple(self._sample_env_bilinear(u, v))
+        return tuple(self.sample_env(direction)[0].tolist())
+
+    def check_gbuffer(self):
+        if not self.keep_gbuffer:
+            return
+        if self.mode not in Wavefront.BATCH_MODES:
+            raise ValueError("keep_gbuffer requires mode='wavefront' or mode='deferred'")
+        conflicts = (
+            ("workers > 1", self.workers > 1),
+            ("a memory-mapped framebuffer", bool(self.framebuffer_path)),
+            ("adaptive anti-aliasing", self.aa == "adaptive"),
+            ("checkpointing", bool(self.checkpoint_path)),
+            ("distributed rendering", self.distributed is not None),
+        )
+        for name, active in conflicts:
+            if active:
+                raise ValueError(f"keep_gbuffer captures a single-process full-frame G-buffer and cannot be combined with {name}")
 
     def render(self, row_callback=None):
-        if self.ssaa == 1:
-            for j in range(self.height):
-                y = (1 - 2 * ((j + 0.5) / self.height)) * self.tan_fov
-                for i in range(self.width):
-                    x = (2 * ((i + 0.5) / self.width) - 1) * self.tan_fov * self.aspect
-                    dir_cam = np.array((x, y, -1.0), dtype=float)
-                    dir_cam /= (np.linalg.norm(dir_cam) + 1e-8)
-                    color = self.cast_ray(self.cam_pos, dir_cam)
-                    self.framebuffer[j, i] = self._to_u8(color)
-                if row_callback:
-                    row_callback(j)
+        self.check_gbuffer()
+        self.ensure_acceleration()
+        self.compile_lights()
+        checkpoint = self.open_checkpoint()
+        self._open_writers()
+        start = time.perf_counter()
+        completed = False
+        try:
+            if checkpoint is not None:
+                Checkpoint.render(self, checkpoint, row_callback)
+            else:
+                self._render_frame(row_callback)
+            if self.stats is not None:
+                self.stats.add_time("render", time.perf_counter() - start)
+            completed = True
+        finally:
+            self._close_writers()
+            if self.framebuffer_path:
+                self.framebuffer.flush()
+            if checkpoint is not None:
+                checkpoint.close(remove=completed)
+                self.checkpoint = None
+
+    def render_sequence(self, frames, output_path, workers=None, frame_callback=None):
+        return Sequence.render_sequence(self, frames, output_path, workers, frame_callback)
+
+    def reshade(self, row_callback=None):
+        if self.gbuffer is None or not self.gbuffer.matches(self):
+            self.invalidate_acceleration()
+            return self.render(row_callback)
+        self.compile_lights()
+        self._open_writers()
+        start = time.perf_counter()
+        try:
+            self.gbuffer.shade(self, row_callback)
+            if self.stats is not None:
+                self.stats.add_time("reshade", time.perf_counter() - start)
+        finally:
+            self._close_writers()
+
+    def _open_writers(self):
+        self._writers = [ImageOutput.open_writer(path, self.width, self.height) for path in self.outputs]
+
+    def _close_writers(self):
+        for writer in self._writers:
+            writer.close()
+        self._writers = []
+
+    def _render_frame(self, row_callback=None):
+        if self.distributed is not None:
+            Distributed.render(self, row_callback)
+            return
+        if self.keep_gbuffer or (self.mode == "deferred" and self.workers == 1 and not self.framebuffer_path and self.aa != "adaptive"):
+            gbuffer = GBuffer.GBuffer(self)
+            gbuffer.shade(self, row_callback)
+            self.gbuffer = gbuffer if self.keep_gbuffer else None
             return
-        h_hr = self.height * self.ssaa
-        w_hr = self.width * self.ssaa
-        hr_buf = np.zeros((h_hr, w_hr, 3), dtype=np.float32)
-        for j in range(h_hr):
+        if self.workers > 1:
+            ParallelRenderer.render(self, row_callback)
+            return
+        if self.aa == "adaptive":
+            AdaptiveSampler.render(self, row_callback)
+            return
+        if self.mode in Wavefront.BATCH_MODES:
+            Wavefront.render(self, row_callback)
+            return
+        tiles = ParallelRenderer.tile_grid(self.width, self.height, self.tile_size)
+        row_left = ParallelRenderer.row_counts(tiles, self.height)
+        for x0, y0, x1, y1 in tiles:
+            self.store_tile(x0, y0, self.render_tile(x0, y0, x1, y1))
+            for j in range(y0, y1):
+                row_left[j] -= x1 - x0
+                if row_left[j] == 0 and row_callback:
+                    row_callback(j)
+
+    def render_tile(self, x0, y0, x1, y1, tracer=None):
+        self.seed_tile(x0, y0)
+        if self.aa == "adaptive":
+            return AdaptiveSampler.render_tile(self, x0, y0, x1, y1, tracer)
+        if self.mode == "deferred":
+            return GBuffer.render_tile(self, x0, y0, x1, y1, tracer)
+        if self.mode == "wavefront":
+            tracer = tracer if tracer is not None else Wavefront.WavefrontTracer(self)
+            return tracer.render_tile(x0, y0, x1, y1)
+        s = self.ssaa
+        h_hr = self.height * s
+        w_hr = self.width * s
+        hr_buf = np.zeros(((y1 - y0) * s, (x1 - x0) * s, 3), dtype=float if s == 1 else np.float32)
+        for j in range(y0 * s, y1 * s):
             y = (1 - 2 * ((j + 0.5) / h_hr)) * self.tan_fov
-            for i in range(w_hr):
+            for i in range(x0 * s, x1 * s):
                 x = (2 * ((i + 0.5) / w_hr) - 1) * self.tan_fov * self.aspect
                 dir_cam = np.array((x, y, -1.0), dtype=float)
                 dir_cam /= (np.linalg.norm(dir_cam) + 1e-8)
-                hr_buf[j, i] = np.array(self.cast_ray(self.cam_pos, dir_cam), dtype=np.float32)
-            if row_callback and (j % self.ssaa) == 0:
-                row_callback(j // self.ssaa)
-            if (j % self.ssaa) == (self.ssaa - 1):
-                y_low = j // self.ssaa
-                y0 = y_low * self.ssaa
-                y1 = y0 + self.ssaa
-                for x_low in range(self.width):
-                    x0 = x_low * self.ssaa
-                    x1 = x0 + self.ssaa
-                    block = hr_buf[y0:y1, x0:x1]
-                    avg = block.mean(axis=(0, 1))
-                    self.framebuffer[y_low, x_low] = self._to_u8(avg)
+                hr_buf[j - y0 * s, i - x0 * s] = self.cast_ray(self.cam_pos, dir_cam)
+        if s == 1:
+            return hr_buf
+        return hr_buf.reshape(y1 - y0, s, x1 - x0, s, 3).mean(axis=(1, 3))
 
     def cast_ray(self, origin, direction, recursion=0):
         o_vec = np.array(origin, dtype=float)
         d_vec = np.array(direction, dtype=float)
         d_vec /= (np.linalg.norm(d_vec) + 1e-8)
+        if self.stats is not None:
+            self.stats.ray("primary", recursion)
         hit = self.scene_intersect(o_vec, d_vec)
         if hit is None:
             return self.get_env_map_color(o_vec, d_vec) if self.env is not None else self.bg_color
         return hit.obj.material.get_surface_color(hit, self, recursion)
 
-    def scene_intersect(self, origin, direction, ignore_obj=None):
+    def scene_intersect(self, origin, direction, ignore_obj=None, ignore_prim=None):
         o_vec = np.array(origin, dtype=float)
         d_vec = np.array(direction, dtype=float)
         d_vec /= (np.linalg.norm(d_vec) + 1e-8)
-        nearest_hit = None
-        nearest_t = float("inf")
-        for obj in self.objects:
-            if obj is ignore_obj:
-                continue
-            hit = obj.ray_intersect(o_vec, d_vec)
-            if hit and 1e-4 < hit.distance < nearest_t:
-                nearest_hit = hit
-                nearest_t = hit.distance
-        return nearest_hit
+        self.ensure_acceleration()
+        objects = self.objects
+        nearest = [None, float("inf"), -1]
+        stats = self.stats
+        start = time.perf_counter() if stats is not None else 0.0
+        
+        def visit(prims, t_max):
+            for k in prims:
+                obj = objects[k]
+                limit = np.nextafter(nearest[1], np.inf)
+                if obj is not ignore_obj:
+                    hit = obj.ray_intersect(o_vec, d_vec, t_max=limit)
+                elif ignore_prim is not None:
+                    hit = obj.ray_intersect(o_vec, d_vec, t_max=limit, ignore_prim=ignore_prim)
+                else:
+                    continue
+                if stats is not None:
+                    stats.test(type(obj).__name__, int(hit is not None))
+                if hit and 1e-4 < hit.distance <= nearest[1]:
+                    if hit.distance < nearest[1] or k < nearest[2]:
+                        nearest[:] = [hit, hit.distance, k]
+            return nearest[1]
+            
+        visit(self.unbounded, nearest[1])
+        if self.bvh is not None:
+            self.bvh.traverse(o_vec, d_vec, visit, nearest[1])
+        if stats is not None:
+            stats.add_time("intersect", time.perf_counter() - start)
+        return nearest[0]
+
+    def occluded(self, origin, direction, t_max=float("inf"), ignore_obj=None, ignore_prim=None):
+        o_vec = np.array(origin, dtype=float)
+        d_vec = np.array(direction, dtype=float)
+        d_vec /= (np.linalg.norm(d_vec) + 1e-8)
+        self.ensure_acceleration()
+        objects = self.objects
+        stats = self.stats
+        start = time.perf_counter() if stats is not None else 0.0
+        
+        def blocks(k):
+            obj = objects[k]
+            if obj is not ignore_obj:
+                t = obj.ray_distance(o_vec, d_vec, 1e-4, t_max)
+            elif ignore_prim is not None:
+                t = obj.ray_distance(o_vec, d_vec, 1e-4, t_max, ignore_prim=ignore_prim)
+            else:
+                return False
+            if stats is not None:
+                stats.test(type(obj).__name__, int(t is not None))
+            return t is not None
+            
+        blocked = []
+        
+        def visit(prims, t_limit):
+            for k in prims:
+                if blocks(k):
+                    blocked.append(k)
+                    return None
+            return t_limit
+            
+        if visit(self.unbounded, t_max) is not None and self.bvh is not None:
+            self.bvh.traverse(o_vec, d_vec, visit, t_max)
+        if stats is not None:
+            stats.add_time("shadow", time.perf_counter() - start)
+        return bool(blocked)
 
     def save_bmp(self, filename):
-        fb = self.framebuffer.copy().astype(np.uint8)
-        h, w, _ = fb.shape
-        max_vals = fb.max(axis=(0, 1)).astype(int)
-        max_overall = int(max_vals.max())
-        if 0 < max_overall < 48:
-            scale = min(230.0 / max_overall, 255.0)
-            fb = np.clip((fb.astype(np.float32) * scale), 0, 255).astype(np.uint8)
-        row_stride = w * 3
-        row_padded = (row_stride + 3) & ~3
-        padding = row_padded - row_stride
-        filesize = 14 + 40 + row_padded * h
-        with open(filename, "wb") as f:
-            f.write(b"BM")
-            f.write(filesize.to_bytes(4, "little"))
-            f.write((0).to_bytes(2, "little"))
-            f.write((0).to_bytes(2, "little"))
-            f.write((14 + 40).to_bytes(4, "little"))
-            f.write((40).to_bytes(4, "little"))
-            f.write(w.to_bytes(4, "little", signed=True))
-            f.write(h.to_bytes(4, "little", signed=True))
-            f.write((1).to_bytes(2, "little"))
-            f.write((24).to_bytes(2, "little"))
-            f.write((0).to_bytes(4, "little"))
-            f.write((row_padded * h).to_bytes(4, "little"))
-            f.write((2835).to_bytes(4, "little"))
-            f.write((2835).to_bytes(4, "little"))
-            f.write((0).to_bytes(4, "little"))
-            f.write((0).to_bytes(4, "little"))
-            pad = b"\x00" * padding
-            for y in range(h - 1, -1, -1):
-                row = fb[y]
-                bgr = row[:, [2, 1, 0]]
-                f.write(bgr.tobytes())
-                if padding:
-                    f.write(pad)
\ No newline at end of file
+        ImageOutput.save_image(filename, self.framebuffer, ImageOutput.BMPWriter)
+
+    def save_image(self, filename):
+        ImageOutput.save_image(filename, self.framebuffer)
@@ -0,0 +1,252 @@
+import os
+import zlib
+import struct
+import numpy as np
+
+
+BMP_HEADER_SIZE = 14 + 40
+BMP_DIM_LIMIT = 48
+BMP_BRIGHT_TARGET = 230.0
+CHUNK_ROWS = 64
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def to_u8(color01):
+    return (np.clip(color01, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def _as_u8(tile):
+    return tile if tile.dtype == np.uint8 else to_u8(tile)
+
+
+def _as_float(tile):
+    return tile.astype(np.float32) / 255.0 if tile.dtype == np.uint8 else tile.astype(np.float32)
+
+
+def bmp_brightness_scale(max_value):
+    if 0 < max_value < BMP_DIM_LIMIT:
+        return min(BMP_BRIGHT_TARGET / max_value, 255.0)
+        
+    return None
+
+
+def _brighten(pixels, scale):
+    return np.clip(pixels.astype(np.float32) * scale, 0, 255).astype(np.uint8)
+
+
+class _SeekableWriter(object):
+    pixel_bytes = 3
+
+    def __init__(self, path, width, height, header, row_bytes):
+        self.path = path
+        self.width = int(width)
+        self.height = int(height)
+        self.row_bytes = row_bytes
+        self.data_start = len(header)
+        
+        self.file = open(path, "w+b")
+        self.file.write(header)
+        self.file.truncate(self.data_start + row_bytes * self.height)
+
+    def _encode(self, tile):
+        raise NotImplementedError
+
+    def _offset(self, y, x):
+        return self.data_start + (self.height - 1 - y) * self.row_bytes + x * self.pixel_bytes
+
+    def write_tile(self, x0, y0, tile):
+        data = self._encode(tile)
+        h, n = data.shape
+        
+        if x0 == 0 and n == self.width * self.pixel_bytes:
+            block = np.zeros((h, self.row_bytes), dtype=np.uint8)
+            block[:, :n] = data[::-1]
+            self.file.seek(self._offset(y0 + h - 1, 0))
+            self.file.write(block.tobytes())
+            return
+            
+        for k in range(h):
+            self.file.seek(self._offset(y0 + k, x0))
+            self.file.write(data[k].tobytes())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class BMPWriter(_SeekableWriter):
+    def __init__(self, path, width, height, auto_brighten=True, scale=None):
+        row_padded = (int(width) * 3 + 3) & ~3
+        header = struct.pack("<2sIHHI", b"BM", BMP_HEADER_SIZE + row_padded * int(height), 0, 0, BMP_HEADER_SIZE)
+        header += struct.pack("<IiiHHIIiiII", 40, int(width), int(height), 1, 24, 0, row_padded * int(height), 2835, 2835, 0, 0)
+        
+        super().__init__(path, width, height, header, row_padded)
+        self.auto_brighten = auto_brighten and scale is None
+        self.scale = scale
+        self.max_value = 0
+
+    def _encode(self, tile):
+        pixels = _as_u8(np.asarray(tile))
+        
+        if pixels.size:
+            self.max_value = max(self.max_value, int(pixels.max()))
+            
+        if self.scale is not None:
+            pixels = _brighten(pixels, self.scale)
+            
+        return pixels[:, :, ::-1].reshape(len(pixels), -1)
+
+    def close(self):
+        if self.file is None:
+            return
+            
+        scale = bmp_brightness_scale(self.max_value) if self.auto_brighten else None
+        
+        if scale is not None and self.height:
+            self.file.flush()
+            pixels = np.memmap(self.file, dtype=np.uint8, mode="r+", offset=self.data_start, shape=(self.height, self.row_bytes))
+            
+            for y in range(0, self.height, CHUNK_ROWS):
+                block = pixels[y:y + CHUNK_ROWS, :self.width * 3]
+                block[:] = _brighten(block, scale)
+                
+            pixels.flush()
+            del pixels
+            
+        super().close()
+
+
+class PFMWriter(_SeekableWriter):
+    pixel_bytes = 12
+
+    def __init__(self, path, width, height):
+        header = f"PF\n{int(width)} {int(height)}\n-1.0\n".encode("ascii")
+        super().__init__(path, width, height, header, int(width) * self.pixel_bytes)
+
+    def _encode(self, tile):
+        pixels = np.ascontiguousarray(_as_float(np.asarray(tile)), dtype="<f4")
+        return pixels.view(np.uint8).reshape(len(pixels), -1)
+
+
+class PNGWriter(object):
+    def __init__(self, path, width, height, level=6):
+        self.path = path
+        self.width = int(width)
+        self.height = int(height)
+        self.next_row = 0
+        self.pending = {}
+        self.compressor = zlib.compressobj(level)
+        
+        self.file = open(path, "wb")
+        self.file.write(PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write_tile(self, x0, y0, tile):
+        pixels = _as_u8(np.asarray(tile))
+        h, w = pixels.shape[:2]
+        
+        for k in range(h):
+            entry = self.pending.setdefault(y0 + k, [np.zeros((self.width, 3), dtype=np.uint8), 0])
+            entry[0][x0:x0 + w] = pixels[k]
+            entry[1] += w
+            
+        self._flush_rows()
+
+    def _flush_rows(self, force=False):
+        rows = []
+        
+        while self.next_row < self.height:
+            entry = self.pending.get(self.next_row)
+            
+            if not force and (entry is None or entry[1] < self.width):
+                break
+                
+            rows.append(self.pending.pop(self.next_row)[0] if entry is not None else np.zeros((self.width, 3), dtype=np.uint8))
+            self.next_row += 1
+            
+        if not rows:
+            return
+            
+        block = np.zeros((len(rows), 1 + self.width * 3), dtype=np.uint8)
+        block[:, 1:] = np.stack(rows).reshape(len(rows), -1)
+        data = self.compressor.compress(block.tobytes())
+        
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def close(self):
+        if self.file is None:
+            return
+            
+        self._flush_rows(force=True)
+        self._chunk(b"IDAT", self.compressor.flush())
+        self._chunk(b"IEND", b"")
+        self.file.close()
+        self.file = None
+
+
+class NPYWriter(object):
+    def __init__(self, path, width, height):
+        self.path = path
+        self.array = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(int(height), int(width), 3))
+
+    def write_tile(self, x0, y0, tile):
+        pixels = _as_float(np.asarray(tile))
+        h, w = pixels.shape[:2]
+        self.array[y0:y0 + h, x0:x0 + w] = pixels
+
+    def close(self):
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+
+
+def open_framebuffer(path, width, height, mode="w+"):
+    if mode == "w+":
+        return np.lib.format.open_memmap(path, mode=mode, dtype=np.uint8, shape=(int(height), int(width), 3))
+        
+    return np.lib.format.open_memmap(path, mode=mode)
+
+
+WRITERS = {
+    ".bmp": BMPWriter,
+    ".png": PNGWriter,
+    ".pfm": PFMWriter,
+    ".npy": NPYWriter,
+}
+
+
+def writer_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    
+    if ext not in WRITERS:
+        raise ValueError(f"Unsupported image format: {ext or path}")
+        
+    return WRITERS[ext]
+
+
+def open_writer(path, width, height, **kwargs):
+    return writer_for(path)(path, width, height, **kwargs)
+
+
+def save_image(path, image, writer_cls=None):
+    h, w = image.shape[:2]
+    writer_cls = writer_cls or writer_for(path)
+    
+    if writer_cls is BMPWriter:
+        writer = BMPWriter(path, w, h, scale=bmp_brightness_scale(int(image.max())) if image.size else None)
+    else:
+        writer = writer_cls(path, w, h)
+        
+    try:
+        for y in range(0, h, CHUNK_ROWS):
+            writer.write_tile(0, y, image[y:y + CHUNK_ROWS])
+    finally:
+        writer.close()
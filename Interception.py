@@ -1,8 +1,9 @@
 class Intercept(object):
-    def __init__(self, point, normal, distance, ray_direction, obj, uv=None):
+    def __init__(self, point, normal, distance, ray_direction, obj, uv=None, prim=None):
         self.point = point
         self.normal = normal
         self.distance = distance
         self.ray_direction = ray_direction
         self.obj = obj
-        self.uv = uv
\ No newline at end of file
+        self.uv = uv
+        self.prim = prim
\ No newline at end of file
@@ -87,4 +87,76 @@ class PointLight(Light):
         return v_vec / norm
 
     def distance_to(self, point):
-        return float(np.linalg.norm(self.position - np.array(point, dtype=float)))
\ No newline at end of file
+        return float(np.linalg.norm(self.position - np.array(point, dtype=float)))
+
+
+class LightTable(object):
+    def __init__(self, lights, dtype=float):
+        self.ambient = np.zeros(3, dtype=float)
+        directions = []
+        positions = []
+        colors = []
+        attenuation = []
+        is_point = []
+        
+        for light in lights:
+            light_type = getattr(light, "light_type", "")
+            
+            if light_type == "Ambient":
+                self.ambient += np.array(light.get_light_color(), dtype=float)
+                continue
+                
+            if light_type == "Directional":
+                light_dir = -np.array(light.direction, dtype=float)
+                light_dir /= np.linalg.norm(light_dir) + 1e-8
+                directions.append(light_dir)
+                positions.append((0.0, 0.0, 0.0))
+                attenuation.append((1.0, 0.0, 0.0))
+                is_point.append(False)
+                
+            elif light_type == "Point":
+                directions.append((0.0, 1.0, 0.0))
+                positions.append(light.position)
+                attenuation.append(getattr(light, "attenuation", (1.0, 0.0, 0.0)))
+                is_point.append(True)
+                
+            else:
+                continue
+                
+            colors.append(np.array(light.color, dtype=float) * light.intensity)
+            
+        self.ambient = self.ambient.astype(dtype)
+        self.directions = np.array(directions, dtype=dtype).reshape(-1, 3)
+        self.positions = np.array(positions, dtype=dtype).reshape(-1, 3)
+        self.colors = np.array(colors, dtype=dtype).reshape(-1, 3)
+        self.attenuation = np.array(attenuation, dtype=dtype).reshape(-1, 3)
+        self.is_point = np.array(is_point, dtype=bool)
+        self.point_idx = np.nonzero(self.is_point)[0]
+
+    def __len__(self):
+        return len(self.colors)
+
+    def sample(self, point, shadow_origin, bias=1e-3):
+        light_dir = self.directions.copy()
+        attenuation = np.ones(len(self), dtype=self.colors.dtype)
+        shadow_max = np.full(len(self), np.inf, dtype=self.colors.dtype)
+        
+        p = self.point_idx
+        
+        if p.size:
+            to_light = self.positions[p] - point
+            distance = np.sqrt(np.einsum("ij,ij->i", to_light, to_light))
+            safe = np.where(distance == 0, 1.0, distance)
+            light_dir[p] = np.where((distance == 0)[:, None], (0.0, 1.0, 0.0), to_light / safe[:, None])
+            
+            const, lin, quad = self.attenuation[p].T
+            attenuation[p] = 1.0 / np.maximum(1e-6, const + lin * distance + quad * distance * distance)
+            
+            to_shadow = self.positions[p] - shadow_origin
+            shadow_max[p] = np.sqrt(np.einsum("ij,ij->i", to_shadow, to_shadow)) - bias
+            
+        return light_dir, attenuation, shadow_max
+
+
+def compile_lights(lights, dtype=float):
+    return LightTable(lights, dtype)
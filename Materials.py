@@ -1,6 +1,7 @@
 import numpy as np
-from PIL import Image
-from MathLibrary import reflect_vector
+import time
+import TextureCache
+from MathLibrary import reflect_vector, reflect_batch
 from Refraction import refract_vector, total_internal_reflection, fresnel
 
 
@@ -19,20 +20,22 @@ class Material(object):
         self.mat_type = mat_type
         self.ior = float(ior)
         self.reflectivity = float(reflectivity)
-        self.texture = None
-        self.tex_w = 0
-        self.tex_h = 0
+        self.texture_path = texture_path
+        self._texture = None
+        self._texture_loaded = texture_path is None
         self.tex_brightness = float(tex_brightness)
         self.emissive = np.array(emissive, dtype=float)
-        
-        if texture_path is not None:
+
+    @property
+    def texture(self):
+        if not self._texture_loaded:
             try:
-                img = Image.open(texture_path).convert("RGB")
-                tex = np.asarray(img).astype(np.float32) / 255.0
-                self.texture = tex
-                self.tex_h, self.tex_w, _ = tex.shape
+                self._texture = TextureCache.load_texture(self.texture_path)
             except Exception:
-                self.texture = None
+                self._texture = None
+            self._texture_loaded = True
+            
+        return self._texture
 
     def sample_texture(self, uv):
         if self.texture is None or uv is None:
@@ -42,63 +45,64 @@ class Material(object):
         u = float(u) % 1.0
         v = float(v) % 1.0
         
-        x = int(u * (self.tex_w - 1))
-        y = int((1.0 - v) * (self.tex_h - 1))
+        tex_h, tex_w = self.texture.shape[:2]
+        x = int(u * (tex_w - 1))
+        y = int((1.0 - v) * (tex_h - 1))
         
-        col = self.texture[y, x]
+        col = TextureCache.to_float(self.texture[y, x])
         col = np.clip(col * self.tex_brightness, 0.0, 1.0)
         
         return col
 
-    def get_surface_color(self, intercept, renderer, recursion=0):
+    def sample_texture_batch(self, uv):
+        if self.texture is None:
+            return np.tile(self.diffuse, (len(uv), 1))
+            
+        u = uv[:, 0] % 1.0
+        v = uv[:, 1] % 1.0
+        
+        tex_h, tex_w = self.texture.shape[:2]
+        x = (u * (tex_w - 1)).astype(int)
+        y = ((1.0 - v) * (tex_h - 1)).astype(int)
+        
+        col = TextureCache.to_float(self.texture[y, x])
+        
+        return np.clip(col * self.tex_brightness, 0.0, 1.0)
+
+    def get_surface_color(self, intercept, renderer, recursion=0, weight=1.0):
         normal = intercept.normal / (np.linalg.norm(intercept.normal) + 1e-8)
         view_dir = -intercept.ray_direction
         view_dir /= np.linalg.norm(view_dir) + 1e-8
+        stats = renderer.stats
         
-        ambient = np.zeros(3, dtype=float)
-        for light in renderer.lights:
-            if getattr(light, "light_type", "") == "Ambient":
-                ambient += np.array(light.get_light_color(), dtype=float)
-                
-        diffuse_light = np.zeros(3, dtype=float)
-        specular_light = np.zeros(3, dtype=float)
+        lights = renderer.light_table()
+        ambient = lights.ambient
+        
+        shadow_origin = intercept.point + normal * renderer.surface_bias
+        light_dir, attenuation, shadow_max = lights.sample(intercept.point, shadow_origin, renderer.surface_bias)
+        prim = getattr(intercept, "prim", None)
         
-        for light in renderer.lights:
-            light_type = getattr(light, "light_type", "")
+        if stats is not None:
+            stats.ray("shadow", recursion, len(lights))
             
-            if light_type == "Directional":
-                light_dir = -np.array(light.direction, dtype=float)
-                light_dir /= np.linalg.norm(light_dir) + 1e-8
-                attenuation = 1.0
-                
-            elif light_type == "Point":
-                light_dir = light.direction_from_point(intercept.point)
-                distance = light.distance_to(intercept.point)
-                const, lin, quad = getattr(light, "attenuation", (1.0, 0.0, 0.0))
-                attenuation = 1.0 / max(1e-6, const + lin * distance + quad * distance * distance)
-                
-            else:
-                continue
+        for k in range(len(lights)):
+            if renderer.occluded(shadow_origin, light_dir[k], shadow_max[k], intercept.obj, prim):
+                attenuation[k] = 0.0
                 
-            shadow_origin = intercept.point + normal * 1e-3
-            # CORRECCIÓN: Usamos scene_intersect en lugar de cast_ray para evitar recursión infinita en sombras
-            shadow_hit = renderer.scene_intersect(shadow_origin, light_dir, intercept.obj)
-            
-            if shadow_hit is not None:
-                if light_type == "Point":
-                    if shadow_hit.distance < light.distance_to(shadow_origin) - 1e-3:
-                        continue
-                else:
-                    continue
-                    
-            ndotl = max(0.0, float(np.dot(normal, light_dir)))
-            diffuse_light += np.array(light.color, dtype=float) * light.intensity * ndotl * attenuation
-            
-            reflect_dir = reflect_vector(normal, -light_dir)
-            rdotv = max(0.0, float(np.dot(reflect_dir, view_dir)))
-            specular_light += np.array(light.color, dtype=float) * (rdotv ** self.shininess) * light.intensity * attenuation
+        ndotl = np.maximum(0.0, light_dir @ normal)
+        diffuse_light = (lights.colors * (ndotl * attenuation)[:, None]).sum(axis=0)
+        
+        reflect_dir = reflect_batch(np.broadcast_to(normal, light_dir.shape), -light_dir)
+        rdotv = np.maximum(0.0, reflect_dir @ view_dir)
+        specular_light = (lights.colors * ((rdotv ** self.shininess) * attenuation)[:, None]).sum(axis=0)
+        
+        if stats is not None:
+            start = time.perf_counter()
+            base_color = self.sample_texture(getattr(intercept, "uv", None))
+            stats.add_time("texture", time.perf_counter() - start)
+        else:
+            base_color = self.sample_texture(getattr(intercept, "uv", None))
             
-        base_color = self.sample_texture(getattr(intercept, "uv", None))
         final_base = base_color * (self.ka * ambient + self.kd * diffuse_light) + self.ks * specular_light + self.emissive
         final_base = np.clip(final_base, 0.0, 1.0)
         
@@ -106,18 +110,27 @@ class Material(object):
             if recursion >= renderer.max_depth:
                 return tuple(final_base)
                 
+            survive = renderer.path_survival([weight * self.reflectivity])[0]
+            color = (1.0 - self.reflectivity) * final_base
+            
+            if survive == 0.0:
+                return tuple(np.clip(color, 0.0, 1.0))
+                
             reflect_dir = reflect_vector(normal, view_dir)
-            reflect_origin = intercept.point + normal * 1e-3
+            reflect_origin = intercept.point + normal * renderer.surface_bias
             
+            if stats is not None:
+                stats.ray("reflection", recursion + 1)
+                
             # CORRECCIÓN: Usamos scene_intersect para obtener el objeto golpeado
-            reflect_hit = renderer.scene_intersect(reflect_origin, reflect_dir, intercept.obj)
+            reflect_hit = renderer.scene_intersect(reflect_origin, reflect_dir, intercept.obj, getattr(intercept, "prim", None))
             
             if reflect_hit is not None:
-                reflect_col = reflect_hit.obj.material.get_surface_color(reflect_hit, renderer, recursion + 1)
+                reflect_col = reflect_hit.obj.material.get_surface_color(reflect_hit, renderer, recursion + 1, weight * self.reflectivity * survive)
             else:
                 reflect_col = renderer.get_env_map_color(reflect_origin, reflect_dir)
                 
-            color = (1.0 - self.reflectivity) * final_base + self.reflectivity * np.array(reflect_col)
+            color = color + self.reflectivity * survive * np.array(reflect_col)
             
             return tuple(np.clip(color, 0.0, 1.0))
             
@@ -127,33 +140,47 @@ class Material(object):
                 
             is_outside = float(np.dot(normal, intercept.ray_direction)) < 0.0
             normal_use = normal if is_outside else -normal
-            bias = normal_use * 1e-3
+            bias = normal_use * renderer.surface_bias
             
             kr, kt = fresnel(normal_use, -view_dir, 1.0, self.ior)
+            survive = renderer.path_survival([weight * kr])[0]
             
-            reflect_dir = reflect_vector(normal_use, view_dir)
-            reflect_origin = intercept.point + bias
-            
-            # CORRECCIÓN: Usamos scene_intersect
-            reflect_hit = renderer.scene_intersect(reflect_origin, reflect_dir, None)
-            
-            if reflect_hit is not None:
-                reflect_col = reflect_hit.obj.material.get_surface_color(reflect_hit, renderer, recursion + 1)
+            if survive > 0.0:
+                reflect_dir = reflect_vector(normal_use, view_dir)
+                reflect_origin = intercept.point + bias
+                
+                if stats is not None:
+                    stats.ray("reflection", recursion + 1)
+                    
+                # CORRECCIÓN: Usamos scene_intersect
+                reflect_hit = renderer.scene_intersect(reflect_origin, reflect_dir, None)
+                
+                if reflect_hit is not None:
+                    reflect_col = reflect_hit.obj.material.get_surface_color(reflect_hit, renderer, recursion + 1, weight * kr * survive)
+                else:
+                    reflect_col = renderer.get_env_map_color(reflect_origin, reflect_dir)
             else:
-                reflect_col = renderer.get_env_map_color(reflect_origin, reflect_dir)
+                reflect_col = np.zeros(3)
                 
+            kr *= survive
+            
             if not total_internal_reflection(normal_use, -view_dir, 1.0, self.ior):
                 refract_dir = refract_vector(normal_use, -view_dir, 1.0, self.ior)
+                survive = renderer.path_survival([weight * kt])[0] if refract_dir is not None else 0.0
                 
-                if refract_dir is not None:
+                if survive > 0.0:
                     refract_origin = intercept.point - bias
+                    if stats is not None:
+                        stats.ray("refraction", recursion + 1)
                     # CORRECCIÓN: Usamos scene_intersect
                     refract_hit = renderer.scene_intersect(refract_origin, refract_dir, None)
                     
                     if refract_hit is not None:
-                        refract_col = refract_hit.obj.material.get_surface_color(refract_hit, renderer, recursion + 1)
+                        refract_col = refract_hit.obj.material.get_surface_color(refract_hit, renderer, recursion + 1, weight * kt * survive)
                     else:
                         refract_col = renderer.get_env_map_color(refract_origin, refract_dir)
+                        
+                    kt *= survive
                 else:
                     kt = 0.0
                     refract_col = np.zeros(3)
@@ -27,4 +27,38 @@ def reflect_vector(normal, direction):
     
     reflect = 2.0 * np.dot(normal, direction) * normal - direction
     
-    return normalize(reflect)
\ No newline at end of file
+    return normalize(reflect)
+
+
+def dot_batch(a, b):
+    return np.einsum("ij,ij->i", a, b)
+
+
+def normalize_batch(v):
+    v = np.asarray(v, dtype=float)
+    norm = np.linalg.norm(v, axis=1, keepdims=True)
+    
+    return v / np.where(norm == 0, 1.0, norm)
+
+
+def reflect_batch(normal, direction):
+    normal = normalize_batch(normal)
+    direction = normalize_batch(direction)
+    
+    reflect = 2.0 * dot_batch(normal, direction)[:, None] * normal - direction
+    
+    return normalize_batch(reflect)
+
+
+def affine_matrix(translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0), scale=1.0):
+    rx, ry, rz = np.deg2rad(np.array(rotate, dtype=float))
+    
+    rot_x = np.array(((1.0, 0.0, 0.0), (0.0, np.cos(rx), -np.sin(rx)), (0.0, np.sin(rx), np.cos(rx))))
+    rot_y = np.array(((np.cos(ry), 0.0, np.sin(ry)), (0.0, 1.0, 0.0), (-np.sin(ry), 0.0, np.cos(ry))))
+    rot_z = np.array(((np.cos(rz), -np.sin(rz), 0.0), (np.sin(rz), np.cos(rz), 0.0), (0.0, 0.0, 1.0)))
+    
+    matrix = np.eye(4)
+    matrix[:3, :3] = rot_z @ rot_y @ rot_x @ np.diag(np.broadcast_to(np.array(scale, dtype=float), 3))
+    matrix[:3, 3] = np.array(translate, dtype=float)
+    
+    return matrix
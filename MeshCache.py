@@ -0,0 +1,113 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+
+CACHE_DIR_ENV = "RAYTRACER_CACHE_DIR"
+CACHE_SUBDIR = ".objcache"
+MAGIC = b"RTMESH03"
+ALIGN = 64
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def source_stat(path):
+    st = os.stat(path)
+    
+    return [os.path.abspath(path), st.st_mtime_ns, st.st_size]
+
+
+def cache_key(path, scale, translate):
+    return {
+        "source": source_stat(path),
+        "scale": float(scale),
+        "translate": [float(t) for t in translate],
+    }
+
+
+def cache_path(key):
+    full_path = key["source"][0]
+    cache_dir = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.dirname(full_path), CACHE_SUBDIR)
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    
+    return os.path.join(cache_dir, f"{os.path.basename(full_path)}.{digest}.mesh")
+
+
+def _fresh(sources):
+    try:
+        return all(source_stat(path) == [path, mtime_ns, size] for path, mtime_ns, size in sources)
+    except OSError:
+        return False
+
+
+def save(cache_file, key, arrays, sources=(), tables=None):
+    layout = {}
+    offset = 0
+    
+    for name, arr in arrays.items():
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset = _aligned(offset + arr.nbytes)
+        
+    header = json.dumps({
+        "key": key,
+        "sources": [list(s) for s in sources],
+        "tables": tables or {},
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+    
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+        
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            for name, arr in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(np.ascontiguousarray(arr).tobytes())
+            f.truncate(data_start + offset)
+            
+        os.replace(tmp_path, cache_file)
+    except OSError:
+        pass
+
+
+def load(cache_file, key):
+    try:
+        with open(cache_file, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            size = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(size).decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+        
+    if header.get("key") != key or not _fresh(header.get("sources", [])):
+        return None
+        
+    data_start = _aligned(len(MAGIC) + 8 + size)
+    
+    try:
+        buf = np.memmap(cache_file, dtype=np.uint8, mode="r")
+    except (OSError, ValueError):
+        return None
+        
+    arrays = {}
+    
+    for name, info in header["arrays"].items():
+        dtype = np.dtype(info["dtype"])
+        shape = tuple(info["shape"])
+        start = data_start + info["offset"]
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        
+        if start + nbytes > len(buf):
+            return None
+            
+        arrays[name] = buf[start:start + nbytes].view(dtype).reshape(shape)
+        
+    return arrays, header["tables"]
@@ -1,7 +1,8 @@
 import os
 import numpy as np
-from Figures import Triangle
+from Figures import Triangle, TriangleMesh, Instance
 from Materials import Material
+import MeshCache
 
 
 def _clone_material_with_texture(base_mat, texture_path):
@@ -26,62 +27,59 @@ def _clone_material_with_texture(base_mat, texture_path):
     return tex_mat
 
 
-def load_obj_as_triangles(path, base_material, scale=1.0, translate=(0, 0, 0)):
-    base_dir = os.path.dirname(path) or "."
+def _parse_obj(path):
+    base_dir = os.path.dirname(os.path.abspath(path))
     vertices = []
     uvs = []
     faces = []
     current_mtl = None
     mtl_file = None
     
-    try:
-        with open(path, "r") as f:
-            for line in f:
-                line = line.strip()
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            
+            if not line or line.startswith("#"):
+                continue
                 
-                if not line or line.startswith("#"):
+            if line.startswith("mtllib"):
+                parts = line.split()
+                if len(parts) >= 2:
+                    mtl_file = parts[1]
+                    
+            elif line.startswith("usemtl"):
+                parts = line.split()
+                if len(parts) >= 2:
+                    current_mtl = parts[1]
+                    
+            elif line.startswith("v "):
+                _, x, y, z = line.split()[:4]
+                vertices.append((float(x), float(y), float(z)))
+                
+            elif line.startswith("vt "):
+                parts = line.split()
+                if len(parts) >= 3:
+                    _, u, v = parts[:3]
+                    uvs.append((float(u), float(v)))
+                    
+            elif line.startswith("f "):
+                parts = line.split()[1:]
+                raw_face = []
+                for p in parts:
+                    vals = p.split("/")
+                    vi = int(vals[0]) - 1
+                    ti = int(vals[1]) - 1 if len(vals) > 1 and vals[1] != "" else None
+                    raw_face.append((vi, ti))
+                    
+                if len(raw_face) < 3:
                     continue
                     
-                if line.startswith("mtllib"):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        mtl_file = parts[1]
-                        
-                elif line.startswith("usemtl"):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        current_mtl = parts[1]
-                        
-                elif line.startswith("v "):
-                    _, x, y, z = line.split()[:4]
-                    vertices.append((float(x), float(y), float(z)))
+                for i in range(1, len(raw_face) - 1):
+                    tri = (raw_face[0], raw_face[i], raw_face[i + 1])
+                    faces.append((tri, current_mtl))
                     
-                elif line.startswith("vt "):
-                    parts = line.split()
-                    if len(parts) >= 3:
-                        _, u, v = parts[:3]
-                        uvs.append((float(u), float(v)))
-                        
-                elif line.startswith("f "):
-                    parts = line.split()[1:]
-                    raw_face = []
-                    for p in parts:
-                        vals = p.split("/")
-                        vi = int(vals[0]) - 1
-                        ti = int(vals[1]) - 1 if len(vals) > 1 and vals[1] != "" else None
-                        raw_face.append((vi, ti))
-                        
-                    if len(raw_face) < 3:
-                        continue
-                        
-                    for i in range(1, len(raw_face) - 1):
-                        tri = (raw_face[0], raw_face[i], raw_face[i + 1])
-                        faces.append((tri, current_mtl))
-                        
-    except FileNotFoundError:
-        return []
-        
     mtl_map = {}
+    mtl_path = None
     
     if mtl_file is not None:
         mtl_path = os.path.join(base_dir, mtl_file)
@@ -103,44 +101,139 @@ def load_obj_as_triangles(path, base_material, scale=1.0, translate=(0, 0, 0)):
                             tex_name = parts[1]
                             tex_path = os.path.join(base_dir, tex_name)
                             mtl_map[current] = tex_path
-                            
-    scale_factor = float(scale)
-    translate_vec = np.array(translate, dtype=float)
-    verts = [scale_factor * np.array(v, dtype=float) + translate_vec for v in vertices]
+        else:
+            mtl_path = None
+            
+    return vertices, uvs, faces, mtl_map, mtl_path
+
+
+def _build_arrays(vertices, uvs, faces, mtl_map, scale, translate):
+    verts = float(scale) * np.array(vertices, dtype=float).reshape(-1, 3) + np.array(translate, dtype=float)
+    uv_array = np.array(uvs, dtype=float).reshape(-1, 2)
     
-    mat_by_mtl = {}
+    mtl_names = []
+    mtl_index = {}
+    face_idx = np.empty((len(faces), 3), dtype=np.int64)
+    uv_idx = np.empty((len(faces), 3), dtype=np.int64)
+    face_mtl = np.empty(len(faces), dtype=np.int64)
     
-    for _, mtl_name in faces:
-        if mtl_name is None:
-            continue
-        if mtl_name in mat_by_mtl:
-            continue
+    for f, (tri, mtl_name) in enumerate(faces):
+        if mtl_name is not None and mtl_name not in mtl_index:
+            mtl_index[mtl_name] = len(mtl_names)
+            mtl_names.append(mtl_name)
             
-        tex_path = mtl_map.get(mtl_name)
+        face_idx[f] = [vi for vi, _ in tri]
+        uv_idx[f] = [ti if (ti is not None and 0 <= ti < len(uvs)) else -1 for _, ti in tri]
+        face_mtl[f] = mtl_index[mtl_name] if mtl_name is not None else -1
+        
+    arrays = {
+        "vertices": verts,
+        "uvs": uv_array,
+        "faces": face_idx,
+        "face_uvs": uv_idx,
+        "face_mtl": face_mtl,
+    }
+    
+    return arrays, [[name, mtl_map.get(name)] for name in mtl_names]
+
+
+def _store_obj_arrays(path, scale, translate, arrays, tables):
+    key = MeshCache.cache_key(path, scale, translate)
+    sources = [MeshCache.source_stat(tables["mtl"])] if tables["mtl"] is not None else []
+    
+    MeshCache.save(MeshCache.cache_path(key), key, arrays, sources, tables)
+
+
+def _load_obj_arrays(path, scale, translate, use_cache=True):
+    key = MeshCache.cache_key(path, scale, translate)
+    cached = MeshCache.load(MeshCache.cache_path(key), key) if use_cache else None
+    
+    if cached is not None:
+        return cached
+        
+    vertices, uvs, faces, mtl_map, mtl_path = _parse_obj(path)
+    arrays, mtl_table = _build_arrays(vertices, uvs, faces, mtl_map, scale, translate)
+    tables = {"materials": mtl_table, "mtl": mtl_path, "meshes": []}
+    
+    if use_cache:
+        _store_obj_arrays(path, scale, translate, arrays, tables)
         
+    return arrays, tables
+
+
+def _materials_for(mtl_table, base_material):
+    materials = []
+    
+    for _, tex_path in mtl_table:
         if tex_path is not None and os.path.exists(tex_path):
-            mat_by_mtl[mtl_name] = _clone_material_with_texture(base_material, tex_path)
+            materials.append(_clone_material_with_texture(base_material, tex_path))
         else:
-            mat_by_mtl[mtl_name] = base_material
+            materials.append(base_material)
             
+    return materials
+
+
+def load_obj_as_triangles(path, base_material, scale=1.0, translate=(0, 0, 0), use_cache=True):
+    try:
+        arrays, tables = _load_obj_arrays(path, scale, translate, use_cache)
+    except FileNotFoundError:
+        return []
+        
+    verts = arrays["vertices"]
+    uvs = arrays["uvs"]
+    materials = _materials_for(tables["materials"], base_material)
+    
     triangles = []
     
-    for (tri, mtl_name) in faces:
-        (vi0, ti0), (vi1, ti1), (vi2, ti2) = tri
+    for tri, uv_tri, m in zip(arrays["faces"], arrays["face_uvs"], arrays["face_mtl"]):
+        uv_a, uv_b, uv_c = [uvs[ti] if ti >= 0 else None for ti in uv_tri]
+        mat = materials[m] if m >= 0 else base_material
         
-        a_point = verts[vi0]
-        b_point = verts[vi1]
-        c_point = verts[vi2]
+        triangles.append(Triangle(verts[tri[0]], verts[tri[1]], verts[tri[2]], mat, uv_a=uv_a, uv_b=uv_b, uv_c=uv_c))
         
-        uv_a = uvs[ti0] if (ti0 is not None and 0 <= ti0 < len(uvs)) else None
-        uv_b = uvs[ti1] if (ti1 is not None and 0 <= ti1 < len(uvs)) else None
-        uv_c = uvs[ti2] if (ti2 is not None and 0 <= ti2 < len(uvs)) else None
+    return triangles
+
+
+def load_obj_as_meshes(path, base_material, scale=1.0, translate=(0, 0, 0), use_cache=True):
+    try:
+        arrays, tables = _load_obj_arrays(path, scale, translate, use_cache)
+    except FileNotFoundError:
+        return []
         
-        if mtl_name is not None and mtl_name in mat_by_mtl:
-            mat = mat_by_mtl[mtl_name]
-        else:
-            mat = base_material
+    materials = _materials_for(tables["materials"], base_material)
+    face_mtl = arrays["face_mtl"]
+    
+    values, first = np.unique(face_mtl, return_index=True)
+    groups = {}
+    
+    for m in values[np.argsort(first)]:
+        mat = materials[m] if m >= 0 else base_material
+        groups.setdefault(id(mat), (mat, []))[1].append(m)
+        
+    meshes = []
+    built = False
+    
+    for mat, mtl_ids in groups.values():
+        sel = np.isin(face_mtl, mtl_ids)
+        prefix = "mesh:" + "_".join(str(m) for m in sorted(mtl_ids)) + "."
+        prebuilt = None
+        
+        if prefix in tables["meshes"]:
+            prebuilt = {name[len(prefix):]: arr for name, arr in arrays.items() if name.startswith(prefix)}
+            
+        mesh = TriangleMesh(arrays["vertices"], arrays["faces"][sel], mat, uvs=arrays["uvs"], face_uvs=arrays["face_uvs"][sel], prebuilt=prebuilt)
+        meshes.append(mesh)
+        
+        if prebuilt is None:
+            arrays.update((prefix + name, arr) for name, arr in mesh.prebuilt_arrays().items())
+            tables["meshes"].append(prefix)
+            built = True
             
-        triangles.append(Triangle(a_point, b_point, c_point, mat, uv_a=uv_a, uv_b=uv_b, uv_c=uv_c))
+    if built and use_cache:
+        _store_obj_arrays(path, scale, translate, arrays, tables)
         
-    return triangles
\ No newline at end of file
+    return meshes
+
+
+def instance_meshes(meshes, material=None, translate=(0, 0, 0), rotate=(0, 0, 0), scale=1.0):
+    return [Instance(mesh, material, translate=translate, rotate=rotate, scale=scale) for mesh in meshes]
@@ -0,0 +1,190 @@
+import multiprocessing as mp
+import time
+import queue
+from multiprocessing import shared_memory
+import numpy as np
+import Wavefront
+import ImageOutput
+from RenderStats import RenderStats
+
+
+def tile_grid(width, height, tile):
+    tiles = []
+    
+    for y0 in range(0, height, tile):
+        for x0 in range(0, width, tile):
+            tiles.append((x0, y0, min(x0 + tile, width), min(y0 + tile, height)))
+            
+    return tiles
+
+
+def row_counts(tiles, height):
+    row_left = [0] * height
+    
+    for x0, y0, x1, y1 in tiles:
+        for j in range(y0, y1):
+            row_left[j] += x1 - x0
+            
+    return row_left
+
+
+class TileDeques(object):
+    def __init__(self, ctx, n_tiles, workers):
+        self.workers = workers
+        self.lock = ctx.Lock()
+        self.ranges = ctx.RawArray("l", 2 * workers)
+        
+        per_worker = n_tiles / float(workers)
+        
+        for w in range(workers):
+            self.ranges[2 * w] = int(round(w * per_worker))
+            self.ranges[2 * w + 1] = int(round((w + 1) * per_worker))
+
+    def pop(self, worker):
+        r = self.ranges
+        
+        with self.lock:
+            head = r[2 * worker]
+            
+            if head < r[2 * worker + 1]:
+                r[2 * worker] = head + 1
+                return head
+                
+            victim = max(range(self.workers), key=lambda v: r[2 * v + 1] - r[2 * v])
+            remaining = r[2 * victim + 1] - r[2 * victim]
+            
+            if remaining <= 0:
+                return None
+                
+            stolen = r[2 * victim + 1] - (remaining + 1) // 2
+            r[2 * worker] = stolen + 1
+            r[2 * worker + 1] = r[2 * victim + 1]
+            r[2 * victim + 1] = stolen
+            
+            return stolen
+
+
+def _worker(renderer, shm_name, tiles, deques, done, index, stream):
+    shm = shared_memory.SharedMemory(name=shm_name) if shm_name else None
+    
+    try:
+        if shm is None:
+            framebuffer = ImageOutput.open_framebuffer(renderer.framebuffer_path, renderer.width, renderer.height, mode="r+")
+        else:
+            framebuffer = np.ndarray((renderer.height, renderer.width, 3), dtype=np.uint8, buffer=shm.buf)
+            
+        if renderer.stats is not None:
+            renderer.stats = RenderStats()
+            
+        tracer = Wavefront.WavefrontTracer(renderer) if renderer.mode in Wavefront.BATCH_MODES else None
+        start = time.perf_counter()
+        
+        while True:
+            k = deques.pop(index)
+            
+            if k is None:
+                break
+                
+            x0, y0, x1, y1 = tiles[k]
+            colors = renderer.render_tile(x0, y0, x1, y1, tracer)
+            framebuffer[y0:y1, x0:x1] = renderer._to_u8(colors)
+            done.put((k, colors.astype(np.float32) if stream else None))
+            
+        if renderer.stats is not None:
+            renderer.stats.add_time("render", time.perf_counter() - start)
+            done.put((None, renderer.stats))
+            
+        if shm is None:
+            framebuffer.flush()
+            
+        del framebuffer
+    finally:
+        if shm is not None:
+            shm.close()
+
+
+def render(renderer, row_callback=None, checkpoint=None):
+    renderer.ensure_acceleration()
+    
+    if checkpoint is not None:
+        todo = checkpoint.missing()
+        tiles = [checkpoint.tiles[k] for k in todo]
+    else:
+        tiles = tile_grid(renderer.width, renderer.height, renderer.tile_size)
+        
+    if not tiles:
+        return
+        
+    workers = max(1, min(renderer.workers, len(tiles)))
+    ctx = mp.get_context()
+    
+    mapped = bool(renderer.framebuffer_path)
+    
+    if mapped:
+        renderer.framebuffer.flush()
+        shm = None
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, renderer.framebuffer.nbytes))
+        
+    try:
+        if mapped:
+            framebuffer = renderer.framebuffer
+        else:
+            framebuffer = np.ndarray(renderer.framebuffer.shape, dtype=np.uint8, buffer=shm.buf)
+            framebuffer[:] = renderer.framebuffer
+            
+        deques = TileDeques(ctx, len(tiles), workers)
+        done = ctx.Queue()
+        procs = [
+            ctx.Process(target=_worker, args=(renderer, shm.name if shm is not None else None, tiles, deques, done, w, bool(renderer.outputs) or checkpoint is not None), daemon=True)
+            for w in range(workers)
+        ]
+        
+        for p in procs:
+            p.start()
+            
+        row_left = row_counts(tiles, renderer.height)
+        remaining = len(tiles)
+        pending_stats = workers if renderer.stats is not None else 0
+        
+        try:
+            while remaining or pending_stats:
+                try:
+                    k, colors = done.get(timeout=0.5)
+                except queue.Empty:
+                    if any(p.exitcode not in (None, 0) for p in procs):
+                        raise RuntimeError("A render worker exited unexpectedly")
+                    continue
+                    
+                if k is None:
+                    renderer.stats.merge_worker(colors)
+                    pending_stats -= 1
+                    continue
+                    
+                remaining -= 1
+                x0, y0, x1, y1 = tiles[k]
+                
+                if colors is not None:
+                    renderer.emit_tile(x0, y0, colors)
+                    
+                if checkpoint is not None:
+                    checkpoint.store(todo[k], colors)
+                    
+                for j in range(y0, y1):
+                    row_left[j] -= x1 - x0
+                    if row_left[j] == 0 and row_callback:
+                        row_callback(j)
+        finally:
+            for p in procs:
+                if remaining:
+                    p.terminate()
+                p.join()
+                
+        if not mapped:
+            renderer.framebuffer[:] = framebuffer
+            
+        del framebuffer
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,181 @@
+import copy
+import time
+import numpy as np
+import Wavefront
+import ParallelRenderer
+from GraphicLibrary import _HAS_PYGAME
+if _HAS_PYGAME:
+    import pygame
+
+
+PREVIEW_STEPS = (8, 4, 2, 1)
+MOVE_STEP = 0.25
+PRESENT_INTERVAL = 0.1
+IDLE_WAIT_MS = 30
+WINDOW_TITLE = "Ray Tracing - Vista Previa"
+
+
+def preview_level(renderer, step):
+    level = copy.copy(renderer)
+    level.width = max(1, renderer.width // step)
+    level.height = max(1, renderer.height // step)
+    level.aspect = renderer.aspect
+    level.ssaa = 1
+    level.aa = "grid"
+    level.mode = "wavefront"
+    level.workers = 1
+    level.framebuffer = np.zeros((level.height, level.width, 3), dtype=np.uint8)
+    level.framebuffer_path = None
+    level.outputs = []
+    level._writers = []
+    level.checkpoint_path = None
+    level.checkpoint = None
+    level.keep_gbuffer = False
+    level.gbuffer = None
+    level.stats = None
+    
+    return level
+
+
+class Preview(object):
+    def __init__(self, renderer, steps=PREVIEW_STEPS, move_step=MOVE_STEP, rebuild=None):
+        self.renderer = renderer
+        self.steps = tuple(steps)
+        self.move_step = float(move_step)
+        self.rebuild = rebuild
+        self.display = np.zeros((renderer.height, renderer.width, 3), dtype=np.uint8)
+        self.levels = []
+        self.pass_index = 0
+        self.next_tile = 0
+        self.dirty = False
+
+    def prepare(self):
+        rend = self.renderer
+        rend.ensure_acceleration()
+        rend.compile_lights()
+        self.levels = []
+        
+        for step in self.steps:
+            level = preview_level(rend, step)
+            tiles = ParallelRenderer.tile_grid(level.width, level.height, level.tile_size)
+            self.levels.append((step, level, Wavefront.WavefrontTracer(level), tiles))
+            
+        self.restart()
+
+    def restart(self):
+        self.pass_index = 0
+        self.next_tile = 0
+
+    def done(self):
+        return self.pass_index >= len(self.levels)
+
+    def move(self, offset):
+        rend = self.renderer
+        rend.cam_pos = np.asarray(rend.cam_pos, dtype=float) + np.asarray(offset, dtype=float) * self.move_step
+        self.restart()
+
+    def reload(self):
+        if self.rebuild is None:
+            return
+            
+        cam_pos = self.renderer.cam_pos
+        self.renderer.clear_scene()
+        self.rebuild(self.renderer)
+        self.renderer.cam_pos = cam_pos
+        self.prepare()
+
+    def step(self):
+        step, level, tracer, tiles = self.levels[self.pass_index]
+        level.cam_pos = self.renderer.cam_pos
+        
+        x0, y0, x1, y1 = tiles[self.next_tile]
+        colors = level.render_tile(x0, y0, x1, y1, tracer)
+        level.store_tile(x0, y0, colors)
+        
+        block = np.repeat(np.repeat(level.framebuffer[y0:y1, x0:x1], step, axis=0), step, axis=1)
+        h = min(block.shape[0], self.display.shape[0] - y0 * step)
+        w = min(block.shape[1], self.display.shape[1] - x0 * step)
+        self.display[y0 * step:y0 * step + h, x0 * step:x0 * step + w] = block[:h, :w]
+        self.dirty = True
+        
+        self.next_tile += 1
+        if self.next_tile == len(tiles):
+            self.pass_index += 1
+            self.next_tile = 0
+            
+        return self.next_tile == 0
+
+    def key_moves(self):
+        return {
+            pygame.K_a: (-1.0, 0.0, 0.0),
+            pygame.K_LEFT: (-1.0, 0.0, 0.0),
+            pygame.K_d: (1.0, 0.0, 0.0),
+            pygame.K_RIGHT: (1.0, 0.0, 0.0),
+            pygame.K_w: (0.0, 0.0, -1.0),
+            pygame.K_UP: (0.0, 0.0, -1.0),
+            pygame.K_s: (0.0, 0.0, 1.0),
+            pygame.K_DOWN: (0.0, 0.0, 1.0),
+            pygame.K_e: (0.0, 1.0, 0.0),
+            pygame.K_PAGEUP: (0.0, 1.0, 0.0),
+            pygame.K_q: (0.0, -1.0, 0.0),
+            pygame.K_PAGEDOWN: (0.0, -1.0, 0.0),
+        }
+
+    def handle(self, event, moves):
+        if event.type == pygame.QUIT:
+            return False
+            
+        if event.type != pygame.KEYDOWN:
+            return True
+            
+        if event.key == pygame.K_ESCAPE:
+            return False
+            
+        if event.key in moves:
+            self.move(moves[event.key])
+        elif event.key == pygame.K_r:
+            self.reload()
+            
+        return True
+
+    def present(self, screen):
+        surface = pygame.surfarray.make_surface(self.display.swapaxes(0, 1))
+        screen.blit(surface, (0, 0))
+        pygame.display.flip()
+        self.dirty = False
+
+    def run(self):
+        if not _HAS_PYGAME:
+            raise RuntimeError("pygame is required for the preview window")
+            
+        pygame.init()
+        
+        try:
+            screen = pygame.display.set_mode((self.renderer.width, self.renderer.height))
+            pygame.display.set_caption(WINDOW_TITLE)
+            moves = self.key_moves()
+            self.prepare()
+            last_present = 0.0
+            
+            while True:
+                if not all(self.handle(event, moves) for event in pygame.event.get()):
+                    break
+                    
+                finished = False
+                if not self.done():
+                    finished = self.step()
+                else:
+                    pygame.time.wait(IDLE_WAIT_MS)
+                    
+                now = time.perf_counter()
+                if self.dirty and (finished or now - last_present >= PRESENT_INTERVAL):
+                    self.present(screen)
+                    last_present = now
+        finally:
+            pygame.quit()
+            
+        return self.renderer.cam_pos
+
+
+def run(renderer, rebuild=None, steps=PREVIEW_STEPS, move_step=MOVE_STEP):
+    return Preview(renderer, steps, move_step, rebuild).run()
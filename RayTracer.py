@@ -1,11 +1,17 @@
 import sys
 import time
+import importlib
 import numpy as np
+import Preview
 from GraphicLibrary import Renderer
+from Checkpoint import checkpoint_path
 from Figures import Plane, Sphere, Cylinder, AABB
 from Lights import AmbientLight, DirectionalLight, PointLight
 from Materials import Material, OPAQUE, REFLECTIVE
-from OBJ_Loader import load_obj_as_triangles
+from OBJ_Loader import load_obj_as_meshes
+from SceneLoader import load_scene
+from Sequence import load_frames
+from Distributed import parse_address, run_worker, authkey_from_env, AUTHKEY_ENV
 
 
 CONSOLE_WIDTH = 70
@@ -19,6 +25,17 @@ def print_header():
     print(line)
 
 
+def get_option(name, default=None):
+    args = sys.argv
+    
+    if name in args:
+        index = args.index(name)
+        if index + 1 < len(args):
+            return args[index + 1]
+            
+    return default
+
+
 def choose_resolution():
     args = sys.argv
     
@@ -61,13 +78,27 @@ def choose_resolution():
     return width, height, 1
 
 
-def print_progress_bar(current_row, total_rows, bar_length=40):
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def print_progress_bar(current_row, total_rows, bar_length=40, elapsed=None, rays=None):
     progress = (current_row + 1) / float(total_rows)
     filled = int(bar_length * progress)
     bar = "#" * filled + "-" * (bar_length - filled)
     percent = int(progress * 100)
     
-    sys.stdout.write(f"\r[{bar}] {percent:3d}%")
+    line = f"\r[{bar}] {percent:3d}%"
+    
+    if elapsed:
+        if rays is not None:
+            line += f" | {rays / elapsed:9.0f} rayos/s"
+        line += f" | ETA {format_duration(elapsed * (1.0 - progress) / progress)}"
+        
+    sys.stdout.write(line)
     sys.stdout.flush()
     
     if current_row + 1 == total_rows:
@@ -161,27 +192,27 @@ def build_scene(rend: Renderer):
             shininess=32,
             mat_type=OPAQUE,
         )
-        star_tris = load_obj_as_triangles(
+        star_meshes = load_obj_as_meshes(
             "star.obj",
             obj_base,
             scale=0.4,
             translate=(0.0, -0.1, -2.0),
         )
-        for tri in star_tris:
-            rend.add_object(tri)
+        for mesh in star_meshes:
+            rend.add_object(mesh)
         loaded_models.append("star.obj")
     except Exception:
         pass
         
     try:
-        mario_tris = load_obj_as_triangles(
+        mario_meshes = load_obj_as_meshes(
             "mario.obj",
             mario_metal,
             scale=11,
             translate=(0.0, -0.6, -14.0),
         )
-        for tri in mario_tris:
-            rend.add_object(tri)
+        for mesh in mario_meshes:
+            rend.add_object(mesh)
         loaded_models.append("mario.obj")
     except Exception:
         pass
@@ -292,8 +323,63 @@ def build_scene(rend: Renderer):
     return env_map_name, loaded_models
 
 
+def reload_scene(rend):
+    module = importlib.reload(importlib.import_module("RayTracer"))
+    return module.build_scene(rend)
+
+
+def run_preview(rend, rebuild=reload_scene):
+    print("VISTA PREVIA")
+    print("WASD / Flechas: Mover Cámara | Q / E: Bajar / Subir | R: Recargar Escena | Esc: Salir")
+    
+    try:
+        cam = Preview.run(rend, rebuild=rebuild)
+    except RuntimeError:
+        print("[ERROR] - La Vista Previa Requiere pygame.")
+        return
+        
+    print(f"Cámara: ({cam[0]:0.2f}, {cam[1]:0.2f}, {cam[2]:0.2f})")
+
+
+def run_sequence(rend, frames, output_path):
+    print(f"SECUENCIA: {len(frames)} Cuadros con {min(rend.workers, len(frames))} Procesos")
+    
+    done = [0]
+    start_time = time.time()
+    
+    def frame_callback(index, path):
+        print_progress_bar(done[0], len(frames), elapsed=time.time() - start_time)
+        done[0] += 1
+        
+    paths = rend.render_sequence(frames, output_path, frame_callback=frame_callback)
+    render_time = time.time() - start_time
+    
+    print()
+    print(f"TIEMPO RENDERIZADO: {render_time:0.2f} segundos ({render_time / max(1, len(frames)):0.2f} por Cuadro)")
+    print(f"Escenas: {paths[0]} ... {paths[-1]}" if len(paths) > 1 else f"Escena: {paths[0]}")
+
+
 def main():
+    worker_address = get_option("--worker")
+    authkey = get_option("--authkey")
+    authkey = authkey.encode("utf-8") if authkey else authkey_from_env()
+    
+    if worker_address:
+        if authkey is None:
+            print(f"[ERROR] - El Trabajador Requiere --authkey o {AUTHKEY_ENV}.")
+            return
+        print(f"Trabajador Conectado a {worker_address}")
+        print(f"Mosaicos Renderizados: {run_worker(parse_address(worker_address), authkey)}")
+        return
+        
     final_width, final_height, final_ssaa = choose_resolution()
+    render_mode = "wavefront" if "--wavefront" in sys.argv else "deferred" if "--deferred" in sys.argv else "scalar"
+    workers = int(get_option("--workers", 1))
+    aa_mode = "adaptive" if "--adaptive" in sys.argv else "grid"
+    aa_samples = int(get_option("--aa-samples", 16))
+    show_stats = "--stats" in sys.argv
+    precision = "float32" if "--float32" in sys.argv else "float64"
+    framebuffer_path = get_option("--framebuffer")
     
     rend = Renderer(
         final_width,
@@ -301,12 +387,57 @@ def main():
         fov=55,
         bg_color=(0.0, 0.0, 0.0),
         ssaa=final_ssaa,
+        mode=render_mode,
+        workers=workers,
+        aa=aa_mode,
+        aa_samples=aa_samples,
+        precision=precision,
+        framebuffer_path=framebuffer_path,
     )
     
     rend.cam_pos = np.array((0.0, 1.4, 3.2), dtype=float)
+    rend.min_weight = float(get_option("--min-weight", rend.min_weight))
+    rend.roulette = "--roulette" in sys.argv
+    rend.roulette_seed = int(get_option("--seed", rend.roulette_seed))
+    
+    scene_path = get_option("--scene")
     
-    env_map_name, loaded_models = build_scene(rend)
+    if scene_path:
+        env_map_name, loaded_models = load_scene(scene_path, rend)
+        rebuild = lambda r: load_scene(scene_path, r)
+    else:
+        env_map_name, loaded_models = build_scene(rend)
+        rebuild = reload_scene
+        
+    if "--preview" in sys.argv:
+        run_preview(rend, rebuild)
+        return
+        
+    sequence_path = get_option("--sequence")
+    
+    if sequence_path:
+        run_sequence(rend, load_frames(sequence_path), get_option("--output", "Mario64.bmp"))
+        return
+        
+    output_path = get_option("--output", "Mario64.bmp")
+    rend.add_output(output_path)
     
+    coordinator_address = get_option("--coordinator")
+    
+    if coordinator_address:
+        address = parse_address(coordinator_address)
+        try:
+            rend.enable_distributed(address, int(get_option("--local-workers", 0)), authkey)
+        except ValueError:
+            print(f"[ERROR] - Un Coordinador en {address[0]} Requiere --authkey o {AUTHKEY_ENV}.")
+            return
+            
+    if "--checkpoint" in sys.argv or "--resume" in sys.argv:
+        rend.enable_checkpoint(checkpoint_path(output_path), resume="--resume" in sys.argv)
+        
+    if show_stats:
+        rend.enable_stats()
+        
     print(f"Environment Map: {env_map_name if env_map_name else '.jpg/.png'}")
     
     if not loaded_models:
@@ -321,13 +452,43 @@ def main():
         
     print(f"Objetos en Escena: {len(rend.objects)}")
     print(f"Luces en Escena: {len(rend.lights)}")
+    print(f"Modo de Render: {render_mode}")
+    print(f"Procesos: {rend.workers}")
+    if rend.distributed is not None:
+        print(f"Coordinador: {rend.distributed[0][0]}:{rend.distributed[0][1]} ({rend.distributed[1]} Trabajadores Locales)")
+        if authkey is None:
+            print(f"Clave de Autenticación: {rend.authkey.decode('ascii')}")
+    print(f"Precisión: {rend.precision}")
+    if framebuffer_path:
+        print(f"Framebuffer en Disco: {framebuffer_path}")
+    if rend.roulette:
+        print(f"Ruleta Rusa: semilla {rend.roulette_seed}")
+    if aa_mode == "adaptive":
+        print(f"Antialiasing: adaptativo (máx. {rend.aa_samples} muestras por píxel)")
+        
+    checkpoint = rend.open_checkpoint()
+    
+    if checkpoint is not None:
+        print(f"Checkpoint: {checkpoint.path}")
+        if checkpoint.stale:
+            print("[AVISO] - El Checkpoint no Coincide con la Escena, se Renderiza desde Cero.")
+        elif checkpoint.restored:
+            print(f"Mosaicos Reanudados: {checkpoint.restored} de {len(checkpoint.tiles)}")
     print()
     
     total_rows = final_height
     print("BARRA DE PROGRESO")
     
+    rows_done = [0]
+    rays_per_row = final_width * rend.ssaa * rend.ssaa
+    
     def row_callback(j):
-        print_progress_bar(j, total_rows)
+        if rend.stats is not None and rend.workers == 1:
+            rays = rend.stats.total_rays()
+        else:
+            rays = (rows_done[0] + 1) * rays_per_row
+        print_progress_bar(rows_done[0], total_rows, elapsed=time.time() - start_time, rays=rays)
+        rows_done[0] += 1
         
     start_time = time.time()
     rend.render(row_callback=row_callback)
@@ -337,8 +498,12 @@ def main():
     print(f"TIEMPO RENDERIZADO: {render_time:0.2f} segundos")
     print()
     
-    output_path = "Mario64.bmp"
-    rend.save_bmp(output_path)
+    if rend.stats is not None:
+        print("ESTADÍSTICAS")
+        for line in rend.stats.report_lines():
+            print(line)
+        print()
+        
     print(f"Escena: {output_path}")
 
 
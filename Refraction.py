@@ -1,5 +1,6 @@
 import numpy as np
 from math import acos, asin
+from MathLibrary import dot_batch
 
 
 def refract_vector(normal, incident, n1, n2):
@@ -59,4 +60,52 @@ def fresnel(normal, incident, n1, n2):
     kr = (f1 + f2) / 2
     kt = 1 - kr
     
+    return kr, kt
+
+
+def _orient_batch(normal, incident, n1, n2):
+    c1 = dot_batch(normal, incident)
+    entering = c1 < 0
+    
+    n1 = np.broadcast_to(np.asarray(n1, dtype=float), c1.shape)
+    n2 = np.broadcast_to(np.asarray(n2, dtype=float), c1.shape)
+    
+    return np.abs(c1), entering, np.where(entering, n1, n2), np.where(entering, n2, n1)
+
+
+def refract_batch(normal, incident, n1, n2):
+    c1, entering, n1, n2 = _orient_batch(normal, incident, n1, n2)
+    normal = np.where(entering[:, None], normal, -normal)
+    
+    n = n1 / n2
+    term = 1 - n ** 2 * (1 - c1 ** 2)
+    valid = term >= 0
+    
+    t_vec = n[:, None] * (incident + c1[:, None] * normal) - normal * np.sqrt(np.maximum(term, 0.0))[:, None]
+    norm = np.linalg.norm(t_vec, axis=1, keepdims=True)
+    
+    return t_vec / np.where(norm == 0, 1.0, norm), valid
+
+
+def total_internal_reflection_batch(normal, incident, n1, n2):
+    c1, _, n1, n2 = _orient_batch(normal, incident, n1, n2)
+    
+    theta1 = np.arccos(np.clip(c1, -1.0, 1.0))
+    theta_c = np.arcsin(np.clip(n2 / n1, -1.0, 1.0))
+    
+    return (n1 >= n2) & (theta1 >= theta_c)
+
+
+def fresnel_batch(normal, incident, n1, n2):
+    c1, _, n1, n2 = _orient_batch(normal, incident, n1, n2)
+    
+    s2 = (n1 * np.sqrt(np.maximum(1 - c1 ** 2, 0.0))) / n2
+    c2 = np.sqrt(np.maximum(1 - s2 ** 2, 0.0))
+    
+    f1 = (((n2 * c1) - (n1 * c2)) / ((n2 * c1) + (n1 * c2))) ** 2
+    f2 = (((n1 * c2) - (n2 * c1)) / ((n1 * c2) + (n2 * c1))) ** 2
+    
+    kr = (f1 + f2) / 2
+    kt = 1 - kr
+    
     return kr, kt
\ No newline at end of file
@@ -0,0 +1,111 @@
+LEAF_STAGES = ("intersect", "shadow", "texture", "env")
+
+
+class RenderStats(object):
+    def __init__(self):
+        self.rays = {}
+        self.tests = {}
+        self.hits = {}
+        self.times = {}
+        self.calls = {}
+        self.worker_times = {}
+        self.workers = 0
+
+    def ray(self, kind, depth=0, n=1):
+        key = (kind, depth)
+        self.rays[key] = self.rays.get(key, 0) + n
+
+    def test(self, name, hits=0, n=1):
+        self.tests[name] = self.tests.get(name, 0) + n
+        
+        if hits:
+            self.hits[name] = self.hits.get(name, 0) + hits
+
+    def add_time(self, stage, seconds, calls=1):
+        self.times[stage] = self.times.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def merge_worker(self, other):
+        for name in ("rays", "tests", "hits", "calls"):
+            mine = getattr(self, name)
+            for key, value in getattr(other, name).items():
+                mine[key] = mine.get(key, 0) + value
+                
+        for stage, seconds in other.times.items():
+            self.worker_times[stage] = self.worker_times.get(stage, 0.0) + seconds
+            
+        self.workers += 1
+
+    def total_rays(self, kind=None):
+        return sum(n for (k, _), n in self.rays.items() if kind is None or k == kind)
+
+    def rays_by_kind(self):
+        kinds = {}
+        for (kind, _), n in self.rays.items():
+            kinds[kind] = kinds.get(kind, 0) + n
+            
+        return kinds
+
+    def rays_by_depth(self):
+        depths = {}
+        for (_, depth), n in self.rays.items():
+            depths[depth] = depths.get(depth, 0) + n
+            
+        return depths
+
+    @staticmethod
+    def stage_times(times):
+        render = times.get("render", 0.0)
+        leaf = sum(times.get(stage, 0.0) for stage in LEAF_STAGES)
+        times = dict(times)
+        
+        if render:
+            times["shading"] = max(0.0, render - leaf)
+            
+        return times
+
+    def as_dict(self):
+        render = self.times.get("render", 0.0)
+        
+        return {
+            "rays": self.rays_by_kind(),
+            "rays_by_depth": {str(d): n for d, n in sorted(self.rays_by_depth().items())},
+            "total_rays": self.total_rays(),
+            "rays_per_sec": self.total_rays() / render if render else None,
+            "intersection_tests": dict(self.tests),
+            "intersection_hits": dict(self.hits),
+            "times": self.stage_times(self.times) if not self.workers else dict(self.times),
+            "workers": self.workers,
+            "worker_times": self.stage_times(self.worker_times),
+            "calls": dict(self.calls),
+        }
+
+    def report_lines(self):
+        data = self.as_dict()
+        lines = [f"Rayos Totales: {data['total_rays']}"]
+        
+        if data["rays_per_sec"]:
+            lines.append(f"Rayos por Segundo: {data['rays_per_sec']:0.0f}")
+            
+        for kind, n in sorted(data["rays"].items()):
+            lines.append(f"  {kind:<12} {n:>12}")
+            
+        lines.append("Rayos por Profundidad:")
+        for depth, n in data["rays_by_depth"].items():
+            lines.append(f"  {depth:<12} {n:>12}")
+            
+        lines.append("Pruebas de Intersección (aciertos):")
+        for name, n in sorted(data["intersection_tests"].items()):
+            lines.append(f"  {name:<12} {n:>12} ({data['intersection_hits'].get(name, 0)})")
+            
+        lines.append("Tiempo por Etapa:")
+        for stage, seconds in sorted(data["times"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {stage:<12} {seconds:>10.3f} s")
+            
+        if data["workers"]:
+            lines.append(f"Tiempo de Trabajadores (suma de {data['workers']} procesos):")
+            for stage, seconds in sorted(data["worker_times"].items(), key=lambda item: -item[1]):
+                lines.append(f"  {stage:<12} {seconds:>10.3f} s")
+                
+        return lines
+
@@ -0,0 +1,191 @@
+import os
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import TextureCache
+from Figures import Sphere, Plane, Disk, Triangle, AABB, Cylinder
+from Lights import AmbientLight, DirectionalLight, PointLight
+from Materials import Material
+from OBJ_Loader import load_obj_as_meshes, instance_meshes
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+PRIMITIVES = {
+    "sphere": Sphere,
+    "plane": Plane,
+    "disk": Disk,
+    "triangle": Triangle,
+    "aabb": AABB,
+    "cylinder": Cylinder,
+}
+LIGHTS = {
+    "ambient": AmbientLight,
+    "directional": DirectionalLight,
+    "point": PointLight,
+}
+
+
+def read_scene(path):
+    ext = os.path.splitext(path)[1].lower()
+    
+    if ext == ".toml":
+        if tomllib is None:
+            raise ValueError("TOML scenes require Python 3.11 or newer")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+            
+    if ext == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+            
+    raise ValueError(f"Unsupported scene format: {ext or path}")
+
+
+def _resolve(base_dir, path):
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def _load_mesh(path, material, scale, translate):
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+        
+    return load_obj_as_meshes(path, material, scale=scale, translate=translate)
+
+
+class SceneLoader(object):
+    def __init__(self, path, lazy_textures=True, workers=LOAD_WORKERS):
+        self.path = path
+        self.base_dir = os.path.dirname(os.path.abspath(path))
+        self.lazy_textures = lazy_textures
+        self.workers = max(1, int(workers))
+        self.data = read_scene(path)
+        self.materials = {}
+
+    def material(self, name):
+        if name is None:
+            return None
+            
+        if name not in self.materials:
+            raise ValueError(f"Unknown material: {name}")
+            
+        return self.materials[name]
+
+    def build_materials(self):
+        for name, params in self.data.get("materials", {}).items():
+            params = dict(params)
+            
+            if params.get("texture_path") is not None:
+                params["texture_path"] = _resolve(self.base_dir, params["texture_path"])
+                
+            self.materials[name] = Material(**params)
+
+    def submit_env(self, pool):
+        env = self.data.get("env")
+        
+        if env is None:
+            return None
+            
+        return pool.submit(TextureCache.load_texture, _resolve(self.base_dir, env["path"]))
+
+    def submit_objects(self, pool):
+        entries = []
+        
+        for index, entry in enumerate(self.data.get("objects", [])):
+            params = dict(entry)
+            kind = params.pop("type")
+            
+            if params.get("material") is None:
+                raise ValueError(f"Object {index} ({kind}) has no material")
+                
+            material = self.material(params.pop("material"))
+            
+            if kind == "mesh":
+                path = _resolve(self.base_dir, params["path"])
+                future = pool.submit(_load_mesh, path, material, params.get("scale", 1.0), params.get("translate", (0.0, 0.0, 0.0)))
+                entries.append((kind, params, future))
+                continue
+                
+            if kind not in PRIMITIVES:
+                raise ValueError(f"Unknown object type: {kind}")
+                
+            entries.append((kind, params, PRIMITIVES[kind](material=material, **params)))
+            
+        return entries
+
+    def prefetch_textures(self, pool, objects):
+        paths = {material.texture_path for material in self.materials.values()}
+        paths.update(getattr(obj.material, "texture_path", None) for obj in objects)
+        paths.discard(None)
+        list(pool.map(TextureCache.load_texture, sorted(paths)))
+
+    def load(self, renderer):
+        self.build_materials()
+        loaded_models = []
+        objects = []
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            env_future = self.submit_env(pool)
+            entries = self.submit_objects(pool)
+            
+            for kind, params, item in entries:
+                if kind != "mesh":
+                    objects.append(item)
+                    continue
+                    
+                meshes = item.result()
+                instances = params.get("instances")
+                
+                if instances is None:
+                    objects.extend(meshes)
+                else:
+                    for inst in instances:
+                        inst = dict(inst)
+                        material = self.material(inst.pop("material", None))
+                        objects.extend(instance_meshes(meshes, material, **inst))
+                        
+                loaded_models.append(os.path.basename(params["path"]))
+                
+            if not self.lazy_textures:
+                self.prefetch_textures(pool, objects)
+                
+            env = env_future.result() if env_future is not None else None
+            
+        for obj in objects:
+            renderer.add_object(obj)
+            
+        for entry in self.data.get("lights", []):
+            params = dict(entry)
+            kind = params.pop("type")
+            
+            if kind not in LIGHTS:
+                raise ValueError(f"Unknown light type: {kind}")
+                
+            renderer.add_light(LIGHTS[kind](**params))
+            
+        env_map_name = None
+        
+        if env is not None:
+            settings = self.data["env"]
+            renderer.env = env
+            renderer.env_yaw = float(settings.get("yaw", 0.0))
+            renderer.env_vflip = bool(settings.get("vflip", False))
+            env_map_name = os.path.basename(settings["path"])
+            
+        camera = self.data.get("camera", {})
+        
+        if "position" in camera:
+            renderer.cam_pos = np.array(camera["position"], dtype=float)
+            
+        if "fov" in camera:
+            renderer.fov = np.deg2rad(camera["fov"])
+            renderer.tan_fov = np.tan(renderer.fov * 0.5)
+            
+        return env_map_name, loaded_models
+
+
+def load_scene(path, renderer, lazy_textures=True, workers=LOAD_WORKERS):
+    return SceneLoader(path, lazy_textures, workers).load(renderer)
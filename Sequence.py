@@ -0,0 +1,123 @@
+import os
+import json
+import multiprocessing as mp
+import numpy as np
+from Figures import Instance
+
+
+FRAME_DIGITS = 4
+
+_state = {}
+
+
+def frame_path(output_path, index, digits=FRAME_DIGITS):
+    root, ext = os.path.splitext(output_path)
+    
+    return f"{root}_{index:0{digits}d}{ext}"
+
+
+def load_frames(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+        
+    return data["frames"] if isinstance(data, dict) else data
+
+
+def touched_objects(frames):
+    return sorted({int(k) for frame in frames for k in frame.get("transforms", {})})
+
+
+def check_touched(renderer, touched):
+    for k in touched:
+        if not 0 <= k < len(renderer.objects):
+            raise ValueError(f"Frame transform targets object {k}, but the scene has {len(renderer.objects)} objects")
+            
+        if not isinstance(renderer.objects[k], Instance):
+            raise ValueError(f"Object {k} is a {type(renderer.objects[k]).__name__}; only Instance objects can be animated")
+
+
+def capture_base(renderer, touched):
+    return np.array(renderer.cam_pos, dtype=float), {k: np.array(renderer.objects[k].matrix, dtype=float) for k in touched}
+
+
+def apply_frame(renderer, frame, base):
+    cam_pos, matrices = base
+    renderer.cam_pos = np.array(frame.get("cam_pos", cam_pos), dtype=float)
+    transforms = {int(k): v for k, v in frame.get("transforms", {}).items()}
+    
+    for k, matrix in matrices.items():
+        params = transforms.get(k)
+        
+        if params is None:
+            renderer.objects[k].set_transform(matrix=matrix)
+        else:
+            renderer.objects[k].set_transform(**params)
+            
+    if matrices:
+        renderer.invalidate_acceleration()
+
+
+def render_frame(renderer, index, frame, base, output_path):
+    apply_frame(renderer, frame, base)
+    renderer.outputs = [frame_path(output_path, index)]
+    renderer.render()
+    
+    return index
+
+
+def _init_worker(renderer, touched):
+    renderer.workers = 1
+    renderer.checkpoint_path = None
+    
+    if renderer.framebuffer is None:
+        renderer.framebuffer_path = None
+        renderer.framebuffer = np.zeros((renderer.height, renderer.width, 3), dtype=np.uint8)
+        
+    _state["renderer"] = renderer
+    _state["base"] = capture_base(renderer, touched)
+
+
+def _render_task(task):
+    index, frame, output_path = task
+    
+    return render_frame(_state["renderer"], index, frame, _state["base"], output_path)
+
+
+def render_sequence(renderer, frames, output_path, workers=None, frame_callback=None):
+    frames = list(frames)
+    paths = [frame_path(output_path, k) for k in range(len(frames))]
+    
+    if not frames:
+        return paths
+        
+    touched = touched_objects(frames)
+    check_touched(renderer, touched)
+    workers = max(1, min(renderer.workers if workers is None else int(workers), len(frames)))
+    tasks = [(k, frame, output_path) for k, frame in enumerate(frames)]
+    
+    renderer.ensure_acceleration()
+    renderer.compile_lights()
+    
+    if workers == 1:
+        base = capture_base(renderer, touched)
+        outputs = renderer.outputs
+        
+        try:
+            for index, frame, path in tasks:
+                render_frame(renderer, index, frame, base, path)
+                if frame_callback:
+                    frame_callback(index, paths[index])
+        finally:
+            apply_frame(renderer, {}, base)
+            renderer.outputs = outputs
+            
+        return paths
+        
+    ctx = mp.get_context()
+    
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(renderer, touched)) as pool:
+        for index in pool.imap_unordered(_render_task, tasks):
+            if frame_callback:
+                frame_callback(index, paths[index])
+                
+    return paths
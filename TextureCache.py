@@ -0,0 +1,83 @@
+import os
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+
+
+CACHE_DIR_ENV = "RAYTRACER_CACHE_DIR"
+CACHE_SUBDIR = ".texcache"
+
+_textures = {}
+_lock = threading.Lock()
+
+
+def _file_key(path):
+    full_path = os.path.abspath(path)
+    st = os.stat(full_path)
+    
+    return full_path, st.st_mtime_ns, st.st_size
+
+
+def _disk_path(key):
+    full_path, mtime_ns, size = key
+    cache_dir = os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.dirname(full_path), CACHE_SUBDIR)
+    digest = hashlib.sha1(full_path.encode("utf-8")).hexdigest()[:16]
+    
+    return os.path.join(cache_dir, f"{os.path.basename(full_path)}.{digest}.{mtime_ns}.{size}.npy")
+
+
+def _load_from_disk(cache_path):
+    try:
+        return np.load(cache_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+
+def _store_on_disk(cache_path, texture):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        
+        with open(tmp_path, "wb") as f:
+            np.save(f, texture)
+            
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+
+def _decode(path):
+    img = Image.open(path).convert("RGB")
+    
+    return np.ascontiguousarray(np.asarray(img, dtype=np.uint8))
+
+
+def load_texture(path, use_disk=True):
+    key = _file_key(path)
+    
+    with _lock:
+        texture = _textures.get(key)
+        
+    if texture is not None:
+        return texture
+        
+    cache_path = _disk_path(key)
+    texture = _load_from_disk(cache_path) if use_disk else None
+    
+    if texture is None:
+        texture = _decode(key[0])
+        if use_disk:
+            _store_on_disk(cache_path, texture)
+            
+    with _lock:
+        return _textures.setdefault(key, texture)
+
+
+def to_float(texels):
+    return np.asarray(texels).astype(np.float32) / 255.0
+
+
+def clear():
+    with _lock:
+        _textures.clear()
@@ -0,0 +1,367 @@
+import numpy as np
+import time
+from Figures import batch_intersect
+from Materials import REFLECTIVE, TRANSPARENT
+from MathLibrary import dot_batch, reflect_batch
+from Refraction import refract_batch, total_internal_reflection_batch, fresnel_batch
+
+
+OPAQUE_CODE = 0
+REFLECTIVE_CODE = 1
+TRANSPARENT_CODE = 2
+BATCH_MODES = ("wavefront", "deferred")
+
+
+class WavefrontTracer(object):
+    def __init__(self, renderer):
+        renderer.ensure_acceleration()
+        self.renderer = renderer
+        self.objects = list(renderer.objects)
+        self.bvh = renderer.bvh
+        self.unbounded = np.array(renderer.unbounded, dtype=int)
+        self.names = [type(obj).__name__ for obj in self.objects]
+        self.stats = renderer.stats
+        self.dtype = renderer.dtype
+        self.bias = renderer.surface_bias
+        
+        self.materials = []
+        mat_index = {}
+        obj_mat = []
+        
+        for obj in self.objects:
+            key = id(obj.material)
+            if key not in mat_index:
+                mat_index[key] = len(self.materials)
+                self.materials.append(obj.material)
+            obj_mat.append(mat_index[key])
+            
+        self.obj_mat = np.array(obj_mat, dtype=int)
+        
+        codes = {REFLECTIVE: REFLECTIVE_CODE, TRANSPARENT: TRANSPARENT_CODE}
+        mats = self.materials
+        self.mat_type = np.array([codes.get(m.mat_type, OPAQUE_CODE) for m in mats], dtype=int)
+        self.ka = np.array([m.ka for m in mats], dtype=self.dtype)
+        self.kd = np.array([m.kd for m in mats], dtype=self.dtype)
+        self.ks = np.array([m.ks for m in mats], dtype=self.dtype)
+        self.shininess = np.array([m.shininess for m in mats], dtype=self.dtype)
+        self.reflectivity = np.array([m.reflectivity for m in mats], dtype=self.dtype)
+        self.ior = np.array([m.ior for m in mats], dtype=self.dtype)
+        self.emissive = np.array([m.emissive for m in mats], dtype=self.dtype).reshape(-1, 3)
+        self.diffuse = np.array([m.diffuse for m in mats], dtype=self.dtype).reshape(-1, 3)
+        
+        self.lights = renderer.light_table()
+        self.ambient = self.lights.ambient
+
+    def camera_rays(self, x0, y0, x1, y1):
+        rend = self.renderer
+        s = rend.ssaa
+        h_hr = rend.height * s
+        w_hr = rend.width * s
+        
+        jj = np.arange(y0 * s, y1 * s)
+        ii = np.arange(x0 * s, x1 * s)
+        y = (1 - 2 * ((jj + 0.5) / h_hr)) * rend.tan_fov
+        x = (2 * ((ii + 0.5) / w_hr) - 1) * rend.tan_fov * rend.aspect
+        
+        dirs = np.empty((len(jj), len(ii), 3), dtype=self.dtype)
+        dirs[..., 0] = x[None, :]
+        dirs[..., 1] = y[:, None]
+        dirs[..., 2] = -1.0
+        dirs = dirs.reshape(-1, 3)
+        dirs /= np.linalg.norm(dirs, axis=1, keepdims=True) + 1e-8
+        
+        orig = np.broadcast_to(np.array(rend.cam_pos, dtype=self.dtype), dirs.shape)
+        
+        return orig, dirs
+
+    def primary_rays(self, x0, y0, x1, y1):
+        orig, dirs = self.camera_rays(x0, y0, x1, y1)
+        
+        if self.stats is not None:
+            self.stats.ray("primary", 0, len(dirs))
+            
+        return orig, dirs
+
+    def render_tile(self, x0, y0, x1, y1):
+        orig, dirs = self.primary_rays(x0, y0, x1, y1)
+        
+        return self.downsample(self.trace(orig, dirs), x1 - x0, y1 - y0)
+
+    def downsample(self, colors, w, h):
+        s = self.renderer.ssaa
+        
+        if s == 1:
+            return colors.reshape(h, w, 3)
+            
+        colors = colors.astype(np.float32).reshape(h, s, w, s, 3)
+        
+        return colors.mean(axis=(1, 3))
+
+    def intersect(self, orig, dirs, ignore=None, ignore_prim=None):
+        start = time.perf_counter()
+        nearest_t = np.full(len(dirs), np.inf, dtype=self.dtype)
+        nearest_id = np.full(len(dirs), -1, dtype=int)
+        nearest_prim = np.full(len(dirs), -1, dtype=np.int64)
+        
+        def visit(prims, rays):
+            for k in prims:
+                t, prim = self._intersect_object(k, orig, dirs, rays, ignore, ignore_prim)
+                cur_t = nearest_t[rays]
+                closer = (t < cur_t) | ((t == cur_t) & np.isfinite(t) & (k < nearest_id[rays]))
+                nearest_t[rays[closer]] = t[closer]
+                nearest_id[rays[closer]] = k
+                nearest_prim[rays[closer]] = prim[closer] if prim is not None else -1
+                
+        visit(self.unbounded, np.arange(len(dirs)))
+        
+        if self.bvh is not None:
+            self.bvh.traverse_batch(orig, dirs, nearest_t, visit)
+            
+        if self.stats is not None:
+            self.stats.add_time("intersect", time.perf_counter() - start)
+            
+        return nearest_t, nearest_id, nearest_prim
+
+    def _intersect_object(self, k, orig, dirs, rays, ignore, ignore_prim, t_max=None):
+        skip = None
+        
+        if ignore is not None:
+            mask = ignore[rays] == k
+            skip_prim = ignore_prim[rays] if ignore_prim is not None else np.full(len(rays), -1)
+            skip = np.where(mask, skip_prim, -1)
+            
+        t, prim = batch_intersect(self.objects[k], orig[rays], dirs[rays], skip, t_max)
+        
+        if skip is not None:
+            t[mask & (skip < 0)] = np.inf
+            
+        if self.stats is not None:
+            self.stats.test(self.names[k], int(np.isfinite(t).sum()), len(rays))
+            
+        return t, prim
+
+    def occluded(self, orig, dirs, t_max, ignore=None, ignore_prim=None):
+        start = time.perf_counter()
+        dirs = dirs / (np.linalg.norm(dirs, axis=1, keepdims=True) + 1e-8)
+        limit = np.array(np.broadcast_to(t_max, len(dirs)), dtype=self.dtype)
+        blocked = np.zeros(len(dirs), dtype=bool)
+        
+        def visit(prims, rays):
+            for k in prims:
+                rays = rays[~blocked[rays]]
+                
+                if not rays.size:
+                    return
+                    
+                t, _ = self._intersect_object(k, orig, dirs, rays, ignore, ignore_prim, limit[rays])
+                hit = rays[t < limit[rays]]
+                blocked[hit] = True
+                limit[hit] = -np.inf
+                
+        visit(self.unbounded, np.arange(len(dirs)))
+        
+        if self.bvh is not None:
+            self.bvh.traverse_batch(orig, dirs, limit, visit)
+            
+        if self.stats is not None:
+            self.stats.add_time("shadow", time.perf_counter() - start)
+            
+        return blocked
+
+    def finalize(self, orig, dirs, t, ids, prims):
+        n = len(t)
+        point = np.empty((n, 3), dtype=self.dtype)
+        normal = np.empty((n, 3), dtype=self.dtype)
+        uv = np.zeros((n, 2), dtype=self.dtype)
+        has_uv = np.zeros(n, dtype=bool)
+        
+        for k in np.unique(ids):
+            sel = np.nonzero(ids == k)[0]
+            p, nrm, tex, ok = self.objects[k].hit_batch(orig[sel], dirs[sel], t[sel], prims[sel])
+            point[sel] = p
+            normal[sel] = nrm
+            uv[sel] = tex
+            has_uv[sel] = ok
+            
+        return point, normal, uv, has_uv
+
+    def env_colors(self, dirs):
+        return self.renderer.sample_env(dirs)
+
+    def sample_textures(self, mat, uv, has_uv):
+        start = time.perf_counter()
+        base = self.diffuse[mat]
+        
+        for m in np.unique(mat):
+            material = self.materials[m]
+            
+            if material.texture is None:
+                continue
+                
+            sel = np.nonzero((mat == m) & has_uv)[0]
+            
+            if sel.size:
+                base[sel] = material.sample_texture_batch(uv[sel])
+                
+        if self.stats is not None:
+            self.stats.add_time("texture", time.perf_counter() - start)
+            
+        return base
+
+    def direct_light(self, point, normal, view, ids, prims, shininess, recursion=0):
+        n = len(point)
+        diffuse_light = np.zeros((n, 3), dtype=self.dtype)
+        specular_light = np.zeros((n, 3), dtype=self.dtype)
+        shadow_origin = point + normal * self.bias
+        lights = self.lights
+        
+        for k in range(len(lights)):
+            if lights.is_point[k]:
+                position = lights.positions[k]
+                to_light = position - point
+                distance = np.linalg.norm(to_light, axis=1)
+                light_dir = np.where((distance == 0)[:, None], (0.0, 1.0, 0.0), to_light / np.where(distance == 0, 1.0, distance)[:, None])
+                const, lin, quad = lights.attenuation[k]
+                attenuation = 1.0 / np.maximum(1e-6, const + lin * distance + quad * distance * distance)
+                t_max = np.linalg.norm(position - shadow_origin, axis=1) - self.bias
+            else:
+                light_dir = np.broadcast_to(lights.directions[k], point.shape)
+                attenuation = np.ones(n, dtype=self.dtype)
+                t_max = np.full(n, np.inf, dtype=self.dtype)
+                
+            if self.stats is not None:
+                self.stats.ray("shadow", recursion, n)
+                
+            lit = ~self.occluded(shadow_origin, light_dir, t_max, ids, prims)
+            
+            color = lights.colors[k]
+            weight = np.where(lit, attenuation, 0.0)[:, None]
+            
+            ndotl = np.maximum(0.0, dot_batch(normal, light_dir))
+            diffuse_light += color * (ndotl[:, None] * weight)
+            
+            reflect_dir = reflect_batch(normal, -light_dir)
+            rdotv = np.maximum(0.0, dot_batch(reflect_dir, view))
+            specular_light += color * ((rdotv ** shininess)[:, None] * weight)
+            
+        return diffuse_light, specular_light
+
+    def trace(self, orig, dirs, recursion=0, ignore=None, ignore_prim=None, weight=None):
+        return self.trace_with_ids(orig, dirs, recursion, ignore, ignore_prim, weight)[0]
+
+    def trace_with_ids(self, orig, dirs, recursion=0, ignore=None, ignore_prim=None, weight=None):
+        dirs = dirs / (np.linalg.norm(dirs, axis=1, keepdims=True) + 1e-8)
+        t, ids, prims = self.intersect(orig, dirs, ignore, ignore_prim)
+        colors = np.empty((len(dirs), 3), dtype=self.dtype)
+        
+        miss = ids < 0
+        if miss.any():
+            colors[miss] = self.env_colors(dirs[miss])
+            
+        hit = np.nonzero(~miss)[0]
+        if hit.size:
+            weight = np.ones(len(dirs), dtype=self.dtype) if weight is None else weight
+            colors[hit] = self.shade(orig[hit], dirs[hit], t[hit], ids[hit], prims[hit], recursion, weight[hit])
+            
+        return colors, ids
+
+    def shade(self, orig, dirs, t, ids, prims, recursion, weight):
+        point, normal, uv, has_uv = self.finalize(orig, dirs, t, ids, prims)
+        
+        return self.shade_surface(point, normal, uv, has_uv, dirs, ids, prims, recursion, weight)
+
+    def reflective_rays(self, group, point, normal, view, dirs, ids, prims, mat, base_weight, queue):
+        r = self.reflectivity[mat[group]]
+        base_weight[group] = 1.0 - r
+        nrm = normal[group]
+        queue.append((group, point[group] + nrm * self.bias, reflect_batch(nrm, view[group]), ids[group], prims[group], r, False))
+
+    def transparent_rays(self, group, point, normal, view, dirs, ids, prims, mat, base_weight, queue):
+        base_weight[group] = 0.0
+        incident = -view[group]
+        ior = self.ior[mat[group]]
+        
+        nrm = normal[group]
+        is_outside = dot_batch(nrm, dirs[group]) < 0.0
+        normal_use = np.where(is_outside[:, None], nrm, -nrm)
+        bias = normal_use * self.bias
+        
+        kr, kt = fresnel_batch(normal_use, incident, 1.0, ior)
+        no_ignore = np.full(group.size, -1, dtype=int)
+        queue.append((group, point[group] + bias, reflect_batch(normal_use, view[group]), no_ignore, no_ignore, kr, False))
+        
+        refract_dir, valid = refract_batch(normal_use, incident, 1.0, ior)
+        valid &= ~total_internal_reflection_batch(normal_use, incident, 1.0, ior)
+        sel = np.nonzero(valid)[0]
+        queue.append((group[sel], point[group[sel]] - bias[sel], refract_dir[sel], no_ignore[sel], no_ignore[sel], kt[sel], True))
+
+    def shade_surface(self, point, normal, uv, has_uv, dirs, ids, prims, recursion, weight):
+        normal = normal / (np.linalg.norm(normal, axis=1, keepdims=True) + 1e-8)
+        view = -dirs / (np.linalg.norm(dirs, axis=1, keepdims=True) + 1e-8)
+        mat = self.obj_mat[ids]
+        
+        diffuse_light, specular_light = self.direct_light(point, normal, view, ids, prims, self.shininess[mat], recursion)
+        
+        base_color = self.sample_textures(mat, uv, has_uv)
+        final_base = base_color * (self.ka[mat, None] * self.ambient + self.kd[mat, None] * diffuse_light)
+        final_base += self.ks[mat, None] * specular_light + self.emissive[mat]
+        final_base = np.clip(final_base, 0.0, 1.0)
+        
+        if recursion >= self.renderer.max_depth:
+            return final_base
+            
+        kind = self.mat_type[mat]
+        base_weight = np.ones(len(point), dtype=self.dtype)
+        queue = []
+        
+        for code, kernel in ((REFLECTIVE_CODE, self.reflective_rays), (TRANSPARENT_CODE, self.transparent_rays)):
+            group = np.nonzero(kind == code)[0]
+            if group.size:
+                kernel(group, point, normal, view, dirs, ids, prims, mat, base_weight, queue)
+                
+        if not queue:
+            return final_base
+            
+        parent = np.concatenate([q[0] for q in queue])
+        q_weight = np.concatenate([q[5] for q in queue])
+        q_refract = np.concatenate([np.full(len(q[0]), q[6]) for q in queue])
+        
+        survive = self.renderer.path_survival(q_weight * weight[parent])
+        keep = np.nonzero(survive > 0.0)[0]
+        color = final_base * base_weight[:, None]
+        
+        if self.stats is not None:
+            self.stats.ray("reflection", recursion + 1, int(np.count_nonzero(~q_refract[keep])))
+            self.stats.ray("refraction", recursion + 1, int(np.count_nonzero(q_refract[keep])))
+            
+        if not keep.size:
+            return np.clip(color, 0.0, 1.0)
+            
+        parent = parent[keep]
+        q_weight = q_weight[keep] * survive[keep]
+        q_orig = np.concatenate([q[1] for q in queue])[keep]
+        q_dirs = np.concatenate([q[2] for q in queue])[keep].astype(self.dtype, copy=False)
+        q_ignore = np.concatenate([q[3] for q in queue])[keep]
+        q_ignore_prim = np.concatenate([q[4] for q in queue])[keep]
+        
+        children = self.trace(q_orig, q_dirs, recursion + 1, q_ignore, q_ignore_prim, q_weight * weight[parent])
+        
+        np.add.at(color, parent, children * q_weight[:, None])
+        
+        return np.clip(color, 0.0, 1.0)
+
+
+def render(renderer, row_callback=None):
+    tracer = WavefrontTracer(renderer)
+    tile = renderer.tile_size
+    
+    for y0 in range(0, renderer.height, tile):
+        y1 = min(y0 + tile, renderer.height)
+        
+        for x0 in range(0, renderer.width, tile):
+            x1 = min(x0 + tile, renderer.width)
+            renderer.store_tile(x0, y0, renderer.render_tile(x0, y0, x1, y1, tracer))
+            
+        if row_callback:
+            for j in range(y0, y1):
+                row_callback(j)
@@ -0,0 +1,28 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import RayTracer
+from GraphicLibrary import Renderer
+
+
+@pytest.fixture
+def repo_dir(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    return ROOT
+
+
+@pytest.fixture
+def scene_renderer(repo_dir):
+    def make(width, height, **kwargs):
+        rend = Renderer(width, height, fov=55, **kwargs)
+        rend.cam_pos = np.array((0.0, 1.4, 3.2))
+        RayTracer.build_scene(rend)
+        return rend
+        
+    return make
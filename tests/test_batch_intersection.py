@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from Figures import Sphere, Plane, Disk, Triangle, AABB, Cylinder, TriangleMesh, Instance, batch_intersect
+from Materials import Material
+
+
+RAYS = 2000
+TOLERANCE = 1e-6
+
+
+def octahedron(material):
+    vertices = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)]
+    faces = [(0, 2, 4), (2, 1, 4), (1, 3, 4), (3, 0, 4), (2, 0, 5), (1, 2, 5), (3, 1, 5), (0, 3, 5)]
+    uvs = [(0.0, 0.5), (0.5, 0.5), (0.25, 1.0), (0.25, 0.0), (0.5, 0.0), (1.0, 1.0)]
+    
+    return TriangleMesh(vertices, faces, material, uvs=uvs, face_uvs=faces)
+
+
+def shapes():
+    m = Material()
+    
+    return [
+        Sphere((0.2, 0.1, -0.3), 0.8, m),
+        Plane((0, -0.5, 0), (0.1, 1, 0), m),
+        Disk((0, 0, 0), (0.3, 1, 0.2), 0.9, m),
+        Triangle((-1, -1, 0), (1, -1, 0.2), (0, 1, -0.1), m, uv_a=(0, 0), uv_b=(1, 0), uv_c=(0.5, 1)),
+        AABB((0, 0, 0), (1, 0.6, 1.4), m),
+        Cylinder((0, 0, 0), (0.2, 1, 0.1), 0.5, 1.2, m),
+        octahedron(m),
+        Instance(AABB((0, 0, 0), (1, 1, 1), m), rotate=(10, 40, 0), scale=0.8, translate=(0.1, 0, 0)),
+        Instance(octahedron(m), rotate=(0, 30, 15), scale=(1.2, 0.7, 1.0), translate=(0, 0.2, 0)),
+    ]
+
+
+def random_rays(seed):
+    rng = np.random.default_rng(seed)
+    orig = rng.normal(size=(RAYS, 3)) * 3.0
+    dirs = rng.normal(size=(RAYS, 3)) * 0.6 - orig
+    
+    return orig, dirs / np.linalg.norm(dirs, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("shape", shapes(), ids=lambda s: type(s).__name__)
+def test_batch_matches_scalar(shape):
+    orig, dirs = random_rays(1)
+    t, prim = batch_intersect(shape, orig, dirs)
+    hit = np.isfinite(t)
+    
+    distances = [shape.ray_distance(o, d) for o, d in zip(orig, dirs)]
+    assert np.array_equal(hit, np.array([d is not None for d in distances]))
+    assert hit.any()
+    
+    ref_t = np.array([d for d in distances if d is not None])
+    np.testing.assert_allclose(t[hit], ref_t, rtol=TOLERANCE, atol=TOLERANCE)
+    
+    point, normal, uv, has_uv = shape.hit_batch(orig[hit], dirs[hit], t[hit], None if prim is None else prim[hit])
+    hits = [shape.ray_intersect(o, d) for o, d in zip(orig[hit], dirs[hit])]
+    assert all(h is not None for h in hits)
+    
+    np.testing.assert_allclose(t[hit], [h.distance for h in hits], rtol=TOLERANCE, atol=TOLERANCE)
+    np.testing.assert_allclose(point, [h.point for h in hits], atol=TOLERANCE)
+    np.testing.assert_allclose(normal, [h.normal for h in hits], atol=TOLERANCE)
+    
+    for h, u, has in zip(hits, uv, has_uv):
+        assert has == (h.uv is not None)
+        if has:
+            np.testing.assert_allclose(u, h.uv, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("shape", shapes(), ids=lambda s: type(s).__name__)
+def test_batch_respects_t_max(shape):
+    orig, dirs = random_rays(2)
+    t, _ = batch_intersect(shape, orig, dirs)
+    t_max = np.where(np.isfinite(t), t, 5.0) * 0.5
+    clipped, _ = batch_intersect(shape, orig, dirs, t_max=t_max)
+    
+    assert not np.any(np.isfinite(clipped) & (clipped >= t_max))
+
+
+@pytest.mark.parametrize("size", [1e-4, 1.0, 1e3])
+def test_mesh_edge_tolerance_is_scale_invariant(size):
+    mesh = TriangleMesh([(0, 0, 0), (size, 0, 0), (0, size, 0)], [(0, 1, 2)], Material())
+    direction = np.array((0.0, 0.0, -1.0))
+    inside = np.array((0.25 * size, 0.01 * size, 1.0))
+    outside = np.array((0.25 * size, -0.01 * size, 1.0))
+    
+    assert mesh.ray_distance(inside, direction) is not None
+    assert mesh.ray_distance(outside, direction) is None
+    
+    t, _ = batch_intersect(mesh, np.array((inside, outside)), np.array((direction, direction)))
+    assert np.isfinite(t[0]) and not np.isfinite(t[1])
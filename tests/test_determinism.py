@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+
+WIDTH, HEIGHT = 48, 24
+
+
+def make_renderer(scene_renderer, **kwargs):
+    rend = scene_renderer(WIDTH, HEIGHT, tile_size=16, **kwargs)
+    rend.roulette = True
+    rend.roulette_threshold = 1.0
+    return rend
+
+
+def render(scene_renderer, **kwargs):
+    rend = make_renderer(scene_renderer, **kwargs)
+    rend.render()
+    return np.array(rend.framebuffer)
+
+
+def render_resumed(scene_renderer, path, **kwargs):
+    rend = make_renderer(scene_renderer, **kwargs)
+    rend.enable_checkpoint(path, resume=True)
+    rows = []
+    
+    def interrupt(j):
+        rows.append(j)
+        if len(rows) == HEIGHT // 2:
+            raise KeyboardInterrupt
+            
+    with pytest.raises(KeyboardInterrupt):
+        rend.render(interrupt)
+        
+    rend = make_renderer(scene_renderer, **kwargs)
+    rend.enable_checkpoint(path, resume=True)
+    assert rend.open_checkpoint().restored > 0
+    rend.render()
+    return np.array(rend.framebuffer)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"mode": "scalar"},
+    {"mode": "scalar", "ssaa": 2},
+    {"mode": "wavefront"},
+    {"mode": "wavefront", "aa": "adaptive"},
+])
+def test_roulette_matches_across_workers_and_resume(scene_renderer, tmp_path, kwargs):
+    serial = render(scene_renderer, workers=1, **kwargs)
+    path = str(tmp_path / "frame.ckpt")
+    
+    assert np.array_equal(serial, render(scene_renderer, workers=2, **kwargs))
+    assert np.array_equal(serial, render_resumed(scene_renderer, path, **kwargs))
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from multiprocessing.connection import Client
+import Distributed
+
+
+WIDTH, HEIGHT = 32, 18
+ADDRESS = ("127.0.0.1", 0)
+
+
+def make_renderer(scene_renderer):
+    return scene_renderer(WIDTH, HEIGHT, mode="wavefront", tile_size=8)
+
+
+def distributed_renderer(scene_renderer, local_workers):
+    rend = make_renderer(scene_renderer)
+    rend.enable_distributed(ADDRESS, local_workers=local_workers)
+    return rend
+
+
+@pytest.fixture
+def serial(scene_renderer):
+    rend = make_renderer(scene_renderer)
+    rend.render()
+    return np.array(rend.framebuffer)
+
+
+def test_local_workers_match_serial(scene_renderer, serial):
+    rend = distributed_renderer(scene_renderer, 2)
+    rend.render()
+    
+    assert np.array_equal(serial, np.array(rend.framebuffer))
+
+
+def test_worker_lost_mid_tile_is_redispatched(scene_renderer, serial, monkeypatch):
+    start_local_workers = Distributed.start_local_workers
+    lost = []
+    
+    def start_after_dropout(address, count, authkey=None):
+        conn = Client(address, authkey=authkey)
+        conn.send(("hello",))
+        conn.recv_bytes()
+        conn.send(("ready",))
+        lost.append(conn.recv())
+        conn.close()
+        return start_local_workers(address, count, authkey)
+        
+    monkeypatch.setattr(Distributed, "start_local_workers", start_after_dropout)
+    rend = distributed_renderer(scene_renderer, 2)
+    rend.render()
+    
+    assert lost and lost[0][0] == "tile"
+    assert np.array_equal(serial, np.array(rend.framebuffer))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+import BVH
+import OBJ_Loader
+from Materials import Material
+
+
+GRID = 12
+
+
+@pytest.fixture
+def obj_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAYTRACER_CACHE_DIR", str(tmp_path / "cache"))
+    xs, zs = np.meshgrid(np.linspace(-1, 1, GRID), np.linspace(-1, 1, GRID), indexing="ij")
+    lines = [f"v {x} {0.1 * np.sin(4 * x * z)} {z}\n" for x, z in zip(xs.ravel(), zs.ravel())]
+    
+    for i in range(GRID - 1):
+        for j in range(GRID - 1):
+            a = i * GRID + j + 1
+            lines.append(f"f {a} {a + 1} {a + GRID}\n")
+            lines.append(f"f {a + 1} {a + GRID + 1} {a + GRID}\n")
+            
+    path = tmp_path / "grid.obj"
+    path.write_text("".join(lines))
+    return str(path)
+
+
+def test_warm_load_skips_bvh_build(obj_path, monkeypatch):
+    cold = OBJ_Loader.load_obj_as_meshes(obj_path, Material())
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("BVH rebuilt on a warm cache load")
+        
+    monkeypatch.setattr(BVH.BVH, "_build", fail)
+    warm = OBJ_Loader.load_obj_as_meshes(obj_path, Material())
+    
+    rng = np.random.default_rng(3)
+    orig = np.tile([0.0, 1.0, 0.0], (256, 1)) + rng.uniform(-0.5, 0.5, (256, 3))
+    dirs = np.tile([0.0, -1.0, 0.0], (256, 1)) + rng.uniform(-0.3, 0.3, (256, 3))
+    dirs /= np.linalg.norm(dirs, axis=1)[:, None]
+    
+    assert len(warm) == len(cold) == 1
+    assert isinstance(warm[0].bvh.node_min, np.memmap)
+    
+    for a, b in zip(cold[0].intersect_batch(orig, dirs), warm[0].intersect_batch(orig, dirs)):
+        assert np.array_equal(a, b)
+        
+    assert warm[0].ray_distance(orig[0], dirs[0]) == cold[0].ray_distance(orig[0], dirs[0])
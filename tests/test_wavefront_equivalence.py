@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from Figures import Sphere, Disk, Cylinder, AABB
+from Materials import Material, TRANSPARENT, REFLECTIVE
+
+
+WIDTH, HEIGHT = 96, 54
+LEVELS = 2
+MAX_DIFFERING = 0.005
+MAX_MEAN = 0.5
+
+
+def make_renderer(scene_renderer, mode):
+    rend = scene_renderer(WIDTH, HEIGHT, mode=mode)
+    rend.load_env_map("sky.jpg", yaw_deg=37.0, vflip=False)
+    
+    glass = Material(diffuse=(0.9, 0.95, 1.0), ks=0.8, shininess=128, mat_type=TRANSPARENT, ior=1.5)
+    mirror = Material(diffuse=(0.9, 0.9, 0.9), mat_type=REFLECTIVE, reflectivity=0.7)
+    wood = Material(texture_path="wood.jpg")
+    stone = Material(texture_path="block.jpg", mat_type=REFLECTIVE, reflectivity=0.3)
+    
+    rend.add_object(Sphere((-0.8, 0.0, -1.2), 0.45, glass))
+    rend.add_object(Disk((0.9, -0.2, -1.6), (-0.4, 0.6, 0.7), 0.5, mirror))
+    rend.add_object(Cylinder((0.2, -0.6, -1.0), (0.3, 1, 0.2), 0.2, 0.7, wood))
+    rend.add_object(AABB((-0.2, -0.5, -2.4), (0.5, 0.5, 0.5), stone))
+    return rend
+
+
+def render(scene_renderer, mode):
+    rend = make_renderer(scene_renderer, mode)
+    rend.render()
+    return np.array(rend.framebuffer, dtype=int)
+
+
+@pytest.mark.parametrize("mode", ["wavefront", "deferred"])
+def test_batch_modes_match_scalar(scene_renderer, mode):
+    diff = np.abs(render(scene_renderer, mode) - render(scene_renderer, "scalar")).max(axis=2)
+    
+    assert (diff > LEVELS).mean() <= MAX_DIFFERING
+    assert diff.mean() <= MAX_MEAN